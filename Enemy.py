@@ -1,7 +1,10 @@
 import pygame
 import math
-import random
 from config import SCREEN_HEIGHT, SCREEN_WIDTH
+from collision import capsule, circle, rect
+from emitters import aimed_spread, random_burst, ring
+from seeding import streams
+from assets import assets
 
 # Colors
 BLACK = (0, 0, 0)
@@ -10,32 +13,81 @@ RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
 
+# Bullets are culled against the play field, not the window, whose size depends on how frames are presented
+PLAY_FIELD = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+
+# Bullet types are plain data: an "image" asset (optionally tinted with "color")
+# or a procedural "rect"/"circle" of the given size and colour, plus a
+# collision "hitbox" from collision.py. Each type's image and mask are built
+# once on first use and shared by every bullet.
+BULLET_TYPES = {}
+_bullet_assets = {}
+_bullet_hitboxes = {}
+
+def register_bullet_type(name, base=None, **spec):
+    """Registers a bullet type; `base` copies another type so colour variants only override what changes."""
+    if base is not None:
+        spec = {**BULLET_TYPES[base], **spec}
+    BULLET_TYPES[name] = spec
+    _bullet_assets.pop(name, None)
+    _bullet_hitboxes.pop(name, None)
+
+def _build_bullet_image(spec):
+    if "image" in spec:
+        image = assets.image(spec["image"])
+        if "color" in spec:
+            image = image.copy()
+            image.fill(spec["color"], special_flags=pygame.BLEND_RGBA_MULT)
+        return image
+
+    width, height = spec["size"]
+    image = pygame.Surface([width, height])
+    if spec.get("shape") == "circle":
+        pygame.draw.circle(image, spec["color"], (width // 2, height // 2), min(width, height) // 2)
+        image.set_colorkey(BLACK)
+    else:
+        image.fill(spec["color"])
+    return image
+
+def get_bullet_assets(bullet_type):
+    """Returns the shared (image, mask) pair for a bullet type, building it on first use."""
+    cached = _bullet_assets.get(bullet_type)
+    if cached is None:
+        image = _build_bullet_image(BULLET_TYPES[bullet_type])
+        cached = _bullet_assets[bullet_type] = (image, pygame.mask.from_surface(image))
+    return cached
+
+def get_bullet_hitbox(bullet_type):
+    """Returns the type's collision shape, falling back to the box around every opaque part of its mask."""
+    hitbox = _bullet_hitboxes.get(bullet_type)
+    if hitbox is None:
+        hitbox = BULLET_TYPES[bullet_type].get("hitbox")
+        if hitbox is None:
+            image, mask = get_bullet_assets(bullet_type)
+            parts = mask.get_bounding_rects()
+            bounds = parts[0].unionall(parts[1:]) if parts else image.get_rect()
+            hitbox = rect(bounds.width, bounds.height, (bounds.centerx - image.get_width() / 2, bounds.centery - image.get_height() / 2))
+        _bullet_hitboxes[bullet_type] = hitbox
+    return hitbox
+
+register_bullet_type("player", image="bullet2", hitbox=circle(6))
+register_bullet_type("enemy_a", size=(8, 8), shape="circle", color=RED, hitbox=circle(4))
+register_bullet_type("enemy_b", size=(10, 10), color=GREEN, hitbox=rect(10, 10))
+register_bullet_type("enemy_c", size=(12, 12), color=BLUE, hitbox=rect(12, 12))
+register_bullet_type("boss_bullet", image="bullet1", hitbox=circle(3, offset=(-2, -1)))
+register_bullet_type("emerald_bullet", image="emerald_bullet", hitbox=capsule(12, 19))
+register_bullet_type("homing_missile", size=(7, 15), color=BLUE, hitbox=rect(7, 15))
+
 class Bullet(pygame.sprite.Sprite):
     def __init__(self, x, y, speedx, speedy, bullet_type="player"):
         super().__init__()
-        self.bullet_type = bullet_type
-        if self.bullet_type == "player":
-            self.image = pygame.image.load("media/images/bullet2.png").convert_alpha()
-        elif self.bullet_type == "enemy_a":
-            self.image = pygame.Surface([8, 8])
-            pygame.draw.circle(self.image, RED, (4, 4), 4)
-            self.image.set_colorkey(BLACK)
-        elif self.bullet_type == "enemy_b":
-            self.image = pygame.Surface([10, 10])
-            self.image.fill(GREEN)
-        elif self.bullet_type == "enemy_c":
-            self.image = pygame.Surface([12, 12])
-            self.image.fill(BLUE)
-        elif self.bullet_type == "boss_bullet":
-            self.image = pygame.image.load("media/images/bullet1.png").convert_alpha()
-        elif self.bullet_type == "emerald_bullet":
-            self.image = pygame.image.load("media/images/emerald-bullet.png").convert_alpha()
-        elif self.bullet_type == "homing_missile":
-            self.image = pygame.Surface([7, 15])
-            self.image.fill(BLUE)
+        self.pool = None
+        self.reset(x, y, speedx, speedy, bullet_type)
 
+    def reset(self, x, y, speedx, speedy, bullet_type="player"):
+        self.bullet_type = bullet_type
+        self.image, self.mask = get_bullet_assets(bullet_type)
         self.rect = self.image.get_rect(center=(x, y))
-        self.mask = pygame.mask.from_surface(self.image)
         self.speedx = speedx
         self.speedy = speedy
         self.grazed = False
@@ -43,9 +95,48 @@ class Bullet(pygame.sprite.Sprite):
     def update(self, frame_count):
         self.rect.x += self.speedx
         self.rect.y += self.speedy
-        if not pygame.display.get_surface().get_rect().colliderect(self.rect):
+        if not PLAY_FIELD.colliderect(self.rect):
             self.kill()
 
+    def kill(self):
+        super().kill()
+        if self.pool:
+            self.pool.release(self)
+
+class BulletPool:
+    """
+    Pre-allocated Bullet sprites handed out and recycled through a free list,
+    so steady fire does not allocate. Killing a pooled bullet returns it here.
+    """
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.free = [Bullet(0, 0, 0, 0) for _ in range(capacity)]
+        self.in_use = 0
+        self.high_water = 0
+        self.misses = 0 # Acquires that had to allocate because the free list was empty
+
+    def acquire(self, x, y, speedx, speedy, bullet_type="player"):
+        if self.free:
+            bullet = self.free.pop()
+            bullet.reset(x, y, speedx, speedy, bullet_type)
+        else:
+            bullet = Bullet(x, y, speedx, speedy, bullet_type)
+            self.misses += 1
+        bullet.pool = self
+        self.in_use += 1
+        if self.in_use > self.high_water:
+            self.high_water = self.in_use
+        return bullet
+
+    def release(self, bullet):
+        bullet.pool = None
+        self.in_use -= 1
+        self.free.append(bullet)
+
+    def stats(self):
+        return {"capacity": self.capacity, "in_use": self.in_use, "free": len(self.free),
+                "high_water": self.high_water, "misses": self.misses}
+
 class Enemy(pygame.sprite.Sprite):
     def __init__(self, x, y, player, all_sprites, enemy_bullets, screen_height, bullet_pattern=None, waypoints=None, speed=1, fast_entry=False):
         super().__init__()
@@ -68,6 +159,8 @@ class Enemy(pygame.sprite.Sprite):
         self.bullet_pattern = bullet_pattern
         self.waypoints = waypoints
         self.current_waypoint_index = 0
+        self.path = None # BakedPath being followed (see formations.py) and the frame reached in it
+        self.path_frame = 0
         self.all_sprites = all_sprites
         self.enemy_bullets = enemy_bullets
 
@@ -81,7 +174,22 @@ class Enemy(pygame.sprite.Sprite):
             if frame_count - data["start_time"] > data["duration"]:
                 del self.debuffs[debuff]
 
+    def follow_path(self, path, frame=0):
+        """Moves by table lookup along a BakedPath, starting at `frame`, which must match this enemy's state."""
+        self.path = path
+        self.path_frame = frame
+
     def move(self, frame_count):
+        if self.path is not None:
+            self.path_frame += 1
+            if self.path_frame < len(self.path.positions):
+                self.position.update(self.path.positions[self.path_frame])
+                self.rect.center = self.position
+                return
+            # Past the end of the table: pick up the last baked state and steer live from there
+            self.path.restore(self, self.path_frame - 1)
+            self.path = None
+
         if self.fast_entry and self.position.y >= self.speed_threshold_y:
             self.decelerating = True
             self.fast_entry = False
@@ -222,25 +330,11 @@ class Boss(pygame.sprite.Sprite):
 
     def non_schematic_1(self, frame_count):
         if frame_count % 12 < 2:
-            angle = math.atan2(self.player.rect.centery - self.rect.centery, 
-                             self.player.rect.centerx - self.rect.centerx)
-            speed = 5
-            bullet = Bullet(self.rect.centerx, self.rect.centery, 
-                          math.cos(angle) * speed, math.sin(angle) * speed, 
-                          "boss_bullet")
-            self.all_sprites.add(bullet)
-            self.enemy_bullets.add(bullet)
+            aimed_spread(self.enemy_bullets, self.rect.centerx, self.rect.centery, self.player.rect.center, 1, 5, "boss_bullet")
 
     def schematic_1(self, frame_count):
         if frame_count % 6 < 2:
-            for _ in range(15):
-                angle = random.uniform(0, 2 * math.pi)
-                speed = random.uniform(1, 3)
-                bullet = Bullet(self.rect.centerx, self.rect.centery, 
-                              math.cos(angle) * speed, math.sin(angle) * speed, 
-                              "boss_bullet")
-                self.all_sprites.add(bullet)
-                self.enemy_bullets.add(bullet)
+            random_burst(self.enemy_bullets, self.rect.centerx, self.rect.centery, 15, (1, 3), "boss_bullet")
 
     def schematic_2(self, frame_count):
         """Spinning wall pattern - alternates left/right with pauses"""
@@ -280,16 +374,8 @@ class Boss(pygame.sprite.Sprite):
             self.schematic_2_rotation_angle += direction * 0.03
             
             num_bullets = 20
-            for i in range(num_bullets):
-                angle = self.schematic_2_rotation_angle + (i * 2 * math.pi / num_bullets)
-                speed = 1.2  # Slow speed for wall effect
-                vx = math.cos(angle) * speed
-                vy = math.sin(angle) * speed
-                
-                bullet = Bullet(self.rect.centerx, self.rect.centery, 
-                              vx, vy, "boss_bullet")
-                self.all_sprites.add(bullet)
-                self.enemy_bullets.add(bullet)
+            speed = 1.2  # Slow speed for wall effect
+            ring(self.enemy_bullets, self.rect.centerx, self.rect.centery, num_bullets, speed, "boss_bullet", angle=self.schematic_2_rotation_angle)
 
 
 
@@ -328,7 +414,7 @@ class Miniboss(Enemy):
         elif self.movement_state == 'at_center':
                     if frame_count - self.movement_timer > 240:
                         self.movement_state = 'moving_to_corner'
-                        if random.random() < 0.5:
+                        if streams.patterns.random() < 0.5:
                             self.waypoints = [self.top_left_pos, self.center_pos]
                         else:
                             self.waypoints = [self.top_right_pos, self.center_pos]
@@ -353,13 +439,7 @@ class Miniboss(Enemy):
             elif self.pattern_state == 2:
                 target_x += 50
 
-            for i in range(10):
-                angle = math.atan2(target_y - self.rect.centery, target_x - self.rect.centerx)
-                angle += random.uniform(-0.1, 0.1)
-                speed = 5
-                bullet = Bullet(self.rect.centerx, self.rect.centery, math.cos(angle) * speed, math.sin(angle) * speed, "enemy_b")
-                self.all_sprites.add(bullet)
-                self.enemy_bullets.add(bullet)
+            aimed_spread(self.enemy_bullets, self.rect.centerx, self.rect.centery, (target_x, target_y), 10, 5, "enemy_b", jitter=0.1)
 
             self.pattern_wave_count += 1
             if self.pattern_state == 0:
@@ -376,12 +456,18 @@ class Miniboss(Enemy):
                     self.pattern_wave_count = 0
 
 class HomingMissile(Bullet):
-    def __init__(self, x, y, speedx, speedy, enemies):
+    # Frames between target searches while a missile is armed but has no target
+    RETARGET_INTERVAL = 6
+
+    def __init__(self, x, y, speedx, speedy, targets, phase=0):
         super().__init__(x, y, speedx, speedy, "homing_missile")
         self.start_pos = pygame.math.Vector2(x, y)
         self.target = None
         self.last_direction = pygame.math.Vector2(0, 0)
-        self.enemies = enemies
+        # Shared SpatialHash of the enemies, rebuilt once per frame by the game session before acquire_target()
+        self.targets = targets
+        # Missiles fired together start at different phases of the retarget interval
+        self.age = phase
 
     def update(self, frame_count):
         if self.target and self.target.alive():
@@ -398,23 +484,25 @@ class HomingMissile(Bullet):
             self.rect.x += self.speedx
             self.rect.y += self.speedy
 
-        if not self.target and self.start_pos.distance_to(self.rect.center) > 300:
-            closest_enemy = None
-            closest_distance = float('inf')
-            for enemy in self.enemies:
-                distance = pygame.math.Vector2(self.rect.center).distance_to(enemy.rect.center)
-                if distance < closest_distance:
-                    closest_distance = distance
-                    closest_enemy = enemy
-            self.target = closest_enemy
+        self.age += 1
+        if not PLAY_FIELD.colliderect(self.rect):
+            self.kill()
+
+    def acquire_target(self):
+        """
+        Looks up the nearest enemy once armed and still without a target.
+        Called after every sprite has moved and the index was rebuilt, so
+        the index matches where the enemies are. Searches happen every
+        RETARGET_INTERVAL frames of age, offset per missile by its phase.
+        """
+        if not self.target and self.age % self.RETARGET_INTERVAL == 0 and self.start_pos.distance_to(self.rect.center) > 300:
+            self.target = self.targets.nearest(self.rect.center)
 
 
 def pattern_simple_shot(enemy, player, all_sprites, enemy_bullets, frame_count):
     if frame_count - enemy.last_shot > enemy.shoot_delay:
         enemy.last_shot = frame_count
-        bullet = Bullet(enemy.rect.centerx, enemy.rect.bottom, 0, 5, "enemy_a")
-        all_sprites.add(bullet)
-        enemy_bullets.add(bullet)
+        enemy_bullets.spawn(enemy.rect.centerx, enemy.rect.bottom, 0, 5, "enemy_a")
 
 def pattern_burst_shot(enemy, player, all_sprites, enemy_bullets, frame_count):
     if not hasattr(enemy, 'burst_count'):
@@ -430,21 +518,14 @@ def pattern_burst_shot(enemy, player, all_sprites, enemy_bullets, frame_count):
     if enemy.burst_count > 0 and frame_count - enemy.last_burst_shot > 6:
         enemy.last_burst_shot = frame_count
         enemy.burst_count -= 1
-        bullet = Bullet(enemy.rect.centerx, enemy.rect.bottom, 0, 7, "enemy_b")
-        all_sprites.add(bullet)
-        enemy_bullets.add(bullet)
+        enemy_bullets.spawn(enemy.rect.centerx, enemy.rect.bottom, 0, 7, "enemy_b")
 
 def pattern_spiral_shot(enemy, player, all_sprites, enemy_bullets, frame_count):
     if not hasattr(enemy, 'angle'):
         enemy.angle = 0
     if frame_count - enemy.last_shot > enemy.shoot_delay:
         enemy.last_shot = frame_count
-        for i in range(8):
-            angle = enemy.angle + i * (2 * math.pi / 8)
-            speed = 3
-            bullet = Bullet(enemy.rect.centerx, enemy.rect.centery, math.cos(angle) * speed, math.sin(angle) * speed, "enemy_c")
-            all_sprites.add(bullet)
-            enemy_bullets.add(bullet)
+        ring(enemy_bullets, enemy.rect.centerx, enemy.rect.centery, 8, 3, "enemy_c", angle=enemy.angle)
         enemy.angle += math.pi / 16
 
 def pattern_triple_shot(enemy, player, all_sprites, enemy_bullets, frame_count):
@@ -452,28 +533,15 @@ def pattern_triple_shot(enemy, player, all_sprites, enemy_bullets, frame_count):
         enemy.shoot_delay = 420
     if frame_count - enemy.last_shot > enemy.shoot_delay:
         enemy.last_shot = frame_count
-        for i in range(-1, 2):
-            bullet = Bullet(enemy.rect.centerx, enemy.rect.bottom, i * 2, 5, "enemy_a")
-            all_sprites.add(bullet)
-            enemy_bullets.add(bullet)
+        enemy_bullets.spawn_many(enemy.rect.centerx, enemy.rect.bottom, (-2, 0, 2), 5, "enemy_a")
 
 def pattern_aimed_shot(enemy, player, all_sprites, enemy_bullets, frame_count):
     if frame_count - enemy.last_shot > enemy.shoot_delay:
         enemy.last_shot = frame_count
-        base_angle = math.atan2(player.rect.centery - enemy.rect.centery, player.rect.centerx - enemy.rect.centerx)
         spread = 0.2 # radians
-        for i in range(3):
-            angle = base_angle + (i - 1) * spread
-            speed = 5
-            bullet = Bullet(enemy.rect.centerx, enemy.rect.centery, math.cos(angle) * speed, math.sin(angle) * speed, "enemy_a")
-            all_sprites.add(bullet)
-            enemy_bullets.add(bullet)
+        aimed_spread(enemy_bullets, enemy.rect.centerx, enemy.rect.centery, player.rect.center, 3, 5, "enemy_a", spread=spread)
 
 def pattern_emerald_shot(enemy, player, all_sprites, enemy_bullets, frame_count):
     if frame_count - enemy.last_shot > enemy.shoot_delay:
         enemy.last_shot = frame_count
-        angle = math.atan2(player.rect.centery - enemy.rect.centery, player.rect.centerx - enemy.rect.centerx)
-        speed = 7
-        bullet = Bullet(enemy.rect.centerx, enemy.rect.centery, math.cos(angle) * speed, math.sin(angle) * speed, "emerald_bullet")
-        all_sprites.add(bullet)
-        enemy_bullets.add(bullet)
+        aimed_spread(enemy_bullets, enemy.rect.centerx, enemy.rect.centery, player.rect.center, 1, 7, "emerald_bullet")
@@ -0,0 +1,51 @@
+import numpy as np
+
+class ArrayField:
+    """
+    Base for entity pools kept as parallel NumPy arrays (structure-of-arrays).
+    Subclasses list their per-entity columns in COLUMNS as (attribute, dtype)
+    pairs; rows [0, count) are live and removal compacts them in place.
+    """
+    COLUMNS = ()
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    def columns(self):
+        return [getattr(self, name) for name, _ in self.COLUMNS]
+
+    def _grow(self, needed):
+        """Doubles the capacity until `needed` rows fit, keeping the live rows."""
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        old = self.columns()
+        self._allocate(capacity)
+        n = self.count
+        for new, prev in zip(self.columns(), old):
+            new[:n] = prev[:n]
+
+    def _compact(self, keep):
+        """Keeps only the live rows where the boolean array `keep` is set, in their current order."""
+        n = self.count
+        kept = int(np.count_nonzero(keep))
+        for arr in self.columns():
+            arr[:kept] = arr[:n][keep]
+        self.count = kept
+
+    def snapshot(self):
+        """The live rows as plain lists by column name, for replay keyframes."""
+        n = self.count
+        return {name: arr[:n].tolist() for (name, _), arr in zip(self.COLUMNS, self.columns())}
+
+    def restore(self, rows):
+        """Replaces the live rows with ones from snapshot()."""
+        n = len(rows[self.COLUMNS[0][0]])
+        self.count = 0
+        if n > self.capacity:
+            self._grow(n)
+        for (name, _), arr in zip(self.COLUMNS, self.columns()):
+            arr[:n] = rows[name]
+        self.count = n
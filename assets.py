@@ -0,0 +1,172 @@
+import threading
+import pygame
+from bundle import Bundle
+from config import SCREEN_HEIGHT, SCREEN_WIDTH, UI_WIDTH
+
+# Every image and sound under media/, by key. The splash image comes first
+# so the splash screen can show while the rest decode.
+IMAGES = {
+    "splash": "media/images/splashScreen.png",
+    "title": "media/images/titleImage.jpg",
+    "logo": "media/images/gameLogo.png",
+    "cursor": "media/images/cursor.png",
+    "options_background": "media/images/template menu.png",
+    "chapter1": "media/images/Chapter1.jpg",
+    "player": "media/images/robin.webp",
+    "bullet1": "media/images/bullet1.png",
+    "bullet2": "media/images/bullet2.png",
+    "emerald_bullet": "media/images/emerald-bullet.png",
+}
+
+SOUNDS = {
+    "death": "media/sfx/death.wav",
+    "select": "media/sfx/Select.wav",
+    "start_game": "media/sfx/startNewGame.wav",
+    "shooting": "media/sfx/rapidFireLoop.wav",
+    "beam": "media/sfx/Laser.wav",
+    "error": "media/sfx/Error.wav",
+}
+
+# Sizes the game scales images to, which bundle.py stores pre-scaled
+FULL_WINDOW = (SCREEN_WIDTH + UI_WIDTH, SCREEN_HEIGHT)
+SCALED_VARIANTS = {
+    "splash": [FULL_WINDOW],
+    "title": [FULL_WINDOW],
+    "options_background": [FULL_WINDOW],
+    "chapter1": [FULL_WINDOW],
+    "player": [(40, 40)],
+}
+
+class AssetManager:
+    """
+    Loads every image and sound on a background thread once start() is
+    called, so decoding overlaps the splash screen. The worker only hands
+    back raw RGBA pixel buffers, since converting to the display format has
+    to happen on the main thread; image() does that on first use. Anything
+    requested before the worker reaches it is waited for, and without a
+    worker (headless runs, benchmarks) assets load synchronously on demand.
+    Assets found in a packed bundle (see bundle.py) skip all of that and are
+    mapped straight from it.
+    """
+    def __init__(self, images=IMAGES, sounds=SOUNDS, bundle=None):
+        self.image_paths = dict(images)
+        self.sound_paths = dict(sounds)
+        self.bundle = bundle
+        self.raw_images = {} # key -> (RGBA bytes, size)
+        self.sounds = {}
+        self.errors = {}
+        self.images = {} # (key, alpha, size) -> converted Surface
+        self.sfx_volume = 1.0
+        self.lock = threading.Condition()
+        self.thread = None
+        self.pending = 0
+
+    @property
+    def total(self):
+        return len(self.image_paths) + len(self.sound_paths)
+
+    def _bundled(self, kind, key):
+        return self.bundle is not None and self.bundle.has(kind, key)
+
+    def start(self):
+        if self.thread is None:
+            jobs = [(self.raw_images, key, path, self._decode_image) for key, path in self.image_paths.items() if not self._bundled("image", key)]
+            jobs += [(self.sounds, key, path, self._decode_sound) for key, path in self.sound_paths.items() if not self._bundled("sound", key)]
+            self.pending = len(jobs)
+            self.thread = threading.Thread(target=self._load_all, args=(jobs,), name="asset-loader", daemon=True)
+            self.thread.start()
+
+    def _load_all(self, jobs):
+        for store, key, path, decode in jobs:
+            try:
+                value = decode(path)
+            except Exception as error:
+                with self.lock:
+                    self.errors[path] = error
+                    self.pending -= 1
+                    self.lock.notify_all()
+                continue
+            with self.lock:
+                self._store(store, key, value)
+                self.pending -= 1
+                self.lock.notify_all()
+
+    def _decode_image(self, path):
+        surface = pygame.image.load(path)
+        return pygame.image.tobytes(surface, "RGBA"), surface.get_size()
+
+    def _decode_sound(self, path):
+        return pygame.mixer.Sound(path)
+
+    def _store(self, store, key, value):
+        if store is self.sounds:
+            value.set_volume(self.sfx_volume)
+        store[key] = value
+
+    def _fetch(self, store, key, path, decode):
+        with self.lock:
+            if self.thread is not None:
+                while key not in store and path not in self.errors:
+                    self.lock.wait()
+            if path in self.errors:
+                raise self.errors[path]
+            if key in store:
+                return store[key]
+        value = decode(path)
+        with self.lock:
+            self._store(store, key, value)
+        return value
+
+    def progress(self):
+        """Fraction of the background loading done (decoded, failed or bundled), from 0.0 to 1.0."""
+        with self.lock:
+            return 1.0 - self.pending / self.total
+
+    def finished(self):
+        return self.progress() >= 1.0
+
+    def image(self, key, alpha=True, size=None):
+        """
+        The image as a Surface converted for the display, with per-pixel alpha
+        unless `alpha` is False, scaled to `size` if given. The Surface is
+        shared: copy it before drawing on it or changing its colour key.
+        """
+        cache_key = (key, alpha, size)
+        surface = self.images.get(cache_key)
+        if surface is None:
+            surface = self.bundle.image(key, size) if self.bundle is not None else None
+            if surface is not None:
+                # Bundled pixels are already in the display's alpha format; opaque images still need one copy
+                if not alpha and pygame.display.get_surface() is not None:
+                    surface = surface.convert()
+            elif size is not None:
+                surface = pygame.transform.scale(self.image(key, alpha), size)
+            else:
+                pixels, image_size = self._fetch(self.raw_images, key, self.image_paths[key], self._decode_image)
+                surface = pygame.image.frombytes(pixels, image_size, "RGBA")
+                if pygame.display.get_surface() is not None:
+                    surface = surface.convert_alpha() if alpha else surface.convert()
+            self.images[cache_key] = surface
+        return surface
+
+    def sound(self, key):
+        if key not in self.sounds and self._bundled("sound", key):
+            with self.lock:
+                self._store(self.sounds, key, self.bundle.sound(key))
+        return self._fetch(self.sounds, key, self.sound_paths[key], self._decode_sound)
+
+    def set_sfx_volume(self, volume):
+        with self.lock:
+            self.sfx_volume = volume
+            for sound in self.sounds.values():
+                sound.set_volume(volume)
+
+class SoundTable:
+    """Dict-style view of a manager's sounds, so sfx["select"].play() waits for just that sound."""
+    def __init__(self, manager):
+        self.manager = manager
+
+    def __getitem__(self, key):
+        return self.manager.sound(key)
+
+assets = AssetManager(bundle=Bundle.open_if_present())
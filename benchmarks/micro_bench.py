@@ -0,0 +1,299 @@
+"""
+Microbenchmarks for the hot paths, each built directly from the real game
+classes at a controlled scale. Results are compared against a stored JSON
+baseline and any case slower than baseline * (1 + tolerance) is flagged.
+
+    python -m benchmarks.micro_bench                  # run and compare
+    python -m benchmarks.micro_bench --save-baseline  # record a new baseline
+    python -m benchmarks.micro_bench -k graze         # only matching cases
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import main
+from Enemy import Bullet, EnemyTypeA, HomingMissile
+from bullet_field import CLEAR_GRAZED, BulletField
+from collision import SpatialHash
+from config import SCREEN_HEIGHT, SCREEN_WIDTH
+from formations import bake_formation
+from items import ItemField
+from particles import ParticleSystem
+from scheduler import Scheduler
+from render import RenderPasses
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+BULLET_COUNTS = (1000, 5000, 20000)
+SEED = 1234
+
+def random_bullets(count, rng, bullet_type="boss_bullet"):
+    """(x, y, vx, vy) tuples spread over the play field with slow velocities so few leave during a run."""
+    return [(rng.uniform(20, SCREEN_WIDTH - 20), rng.uniform(20, SCREEN_HEIGHT - 20),
+             rng.uniform(-0.5, 0.5), rng.uniform(-0.5, 0.5), bullet_type) for _ in range(count)]
+
+def sprite_bullets(specs):
+    return pygame.sprite.Group(*(Bullet(*spec) for spec in specs))
+
+def field_bullets(specs):
+    field = BulletField()
+    for spec in specs:
+        field.spawn(*spec)
+    return field
+
+def make_player():
+    player = main.Player(SpatialHash())
+    player.rect.center = player.position = pygame.math.Vector2(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)
+    return player
+
+def make_enemies(count, rng):
+    enemies = pygame.sprite.Group()
+    for _ in range(count):
+        enemies.add(EnemyTypeA(rng.uniform(0, SCREEN_WIDTH), rng.uniform(0, SCREEN_HEIGHT / 2), None, None, None, SCREEN_HEIGHT))
+    return enemies
+
+# Each case factory builds its scene once and returns the callable that is timed
+def case_bullet_update(count):
+    def setup(rng):
+        group = sprite_bullets(random_bullets(count, rng))
+        return lambda: group.update(0)
+    return setup
+
+def case_field_update(count):
+    def setup(rng):
+        field = field_bullets(random_bullets(count, rng))
+        return lambda: field.update(0)
+    return setup
+
+def case_collide_mask(count):
+    def setup(rng):
+        group = sprite_bullets(random_bullets(count, rng))
+        player = make_player()
+        # The game no longer keeps player masks; this case times the per-pixel test it replaced
+        player.mask = pygame.mask.from_surface(player.image)
+        return lambda: pygame.sprite.spritecollide(player, group, False, pygame.sprite.collide_mask)
+    return setup
+
+def case_field_collide_hitbox(count):
+    def setup(rng):
+        field = field_bullets(random_bullets(count, rng))
+        player = make_player()
+        return lambda: field.collide_hitbox(player.rect.center, player.hitbox, dokill=False)
+    return setup
+
+def case_graze_loop(count):
+    def setup(rng):
+        group = sprite_bullets(random_bullets(count, rng))
+        player = make_player()
+        def run():
+            # The per-bullet Vector2 loop game_loop used before BulletField.graze
+            for bullet in group:
+                if not bullet.grazed and pygame.math.Vector2(player.rect.center).distance_to(bullet.rect.center) < 50:
+                    bullet.grazed = False # Left unset so every run does the same work
+        return run
+    return setup
+
+def case_field_graze(count):
+    def setup(rng):
+        field = field_bullets(random_bullets(count, rng))
+        player = make_player()
+        def run():
+            field.graze(player.rect.center, 50, report_min=True)
+            field.flags[:field.count] &= CLEAR_GRAZED # So every run does the same work
+        return run
+    return setup
+
+def case_homing_search(enemy_count, missile_count=20):
+    def setup(rng):
+        index = SpatialHash()
+        index.rebuild(make_enemies(enemy_count, rng))
+        missiles = [HomingMissile(SCREEN_WIDTH / 2, SCREEN_HEIGHT, 0, 0, index) for _ in range(missile_count)]
+        for missile in missiles:
+            missile.start_pos.y += 400 # Already past the 300px arming distance
+        def run():
+            for missile in missiles:
+                missile.target = None
+                missile.age = 0 # Due to search
+                missile.acquire_target()
+        return run
+    return setup
+
+def case_all_sprites_draw(count):
+    def setup(rng):
+        all_sprites = pygame.sprite.Group(make_player(), *make_enemies(50, rng))
+        all_sprites.add(*sprite_bullets(random_bullets(count, rng)))
+        surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        return lambda: all_sprites.draw(surface)
+    return setup
+
+def case_field_draw(count):
+    def setup(rng):
+        field = field_bullets(random_bullets(count, rng))
+        surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        return lambda: field.draw(surface)
+    return setup
+
+def case_render_passes(count):
+    def setup(rng):
+        # The same scene as all_sprites_draw, drawn as GameSession layers it
+        enemies = make_enemies(50, rng)
+        shots = sprite_bullets(random_bullets(count, rng))
+        passes = RenderPasses()
+        passes.add("enemies", enemies)
+        passes.add("player_bullets", shots)
+        passes.add("player", pygame.sprite.GroupSingle(make_player()))
+        surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        return lambda: passes.draw(surface)
+    return setup
+
+def case_particles(count):
+    def setup(rng):
+        # A mass kill: one pop and a spark burst per enemy, stepped and drawn like a frame
+        particles = ParticleSystem(capacity=count)
+        for _ in range(count // 8):
+            x, y = rng.uniform(0, SCREEN_WIDTH), rng.uniform(0, SCREEN_HEIGHT)
+            particles.emit(x, y, "pop")
+            particles.burst(x, y, "spark", 7, 3)
+        surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        def run():
+            particles.update()
+            particles.age[:particles.count] = 0 # Held at the first frame so every run draws the same count
+            particles.draw(surface)
+        return run
+    return setup
+
+def case_item_magnet(count):
+    def setup(rng):
+        # No cap, so all `count` items stay in the field for the magnet and pickup passes
+        field = ItemField(cap=count)
+        for _ in range(count):
+            field.spawn(rng.uniform(0, SCREEN_WIDTH), rng.uniform(0, SCREEN_HEIGHT / 2), "power")
+        player = make_player()
+        def run():
+            field.attract(player.rect.center, rate=0) # Pulls nowhere so every run does the same work
+            field.collect(player.rect.move(0, SCREEN_HEIGHT))
+        return run
+    return setup
+
+def case_formation_move(baked, columns=10):
+    def setup(rng):
+        # Columns of six like stage 1's 1500 wave, moved through the first second of their path
+        waypoints = [(100, 300), (400, 300), (700, 300)]
+        infos = [{"x": 100, "y": -50 * (i + 1), "waypoints": waypoints, "speed": 5} for i in range(6)]
+        bake_formation(infos)
+        enemies = []
+        for _ in range(columns):
+            for info in infos:
+                enemies.append((EnemyTypeA(info["x"], info["y"], None, None, None, SCREEN_HEIGHT, waypoints=waypoints, speed=5), *info["path"]))
+        def run():
+            for enemy, path, frame in enemies:
+                path.restore(enemy, frame)
+                if baked:
+                    enemy.follow_path(path, frame)
+                for _ in range(60):
+                    enemy.move(0)
+        return run
+    return setup
+
+def case_scheduler(script_count):
+    def setup(rng):
+        # Scripts that each fire every 60-600 frames, like a stage with many staggered timelines
+        def script(phase, period):
+            yield phase
+            while True:
+                yield period
+        scheduler = Scheduler()
+        for _ in range(script_count):
+            period = rng.randint(60, 600)
+            scheduler.start(script(rng.randint(1, period), period))
+        frame = [0]
+        def run():
+            frame[0] += 1
+            scheduler.update(frame[0])
+        return run
+    return setup
+
+CASES = {}
+for count in BULLET_COUNTS:
+    CASES[f"bullet_update_{count}"] = case_bullet_update(count)
+    CASES[f"field_update_{count}"] = case_field_update(count)
+CASES["collide_mask_5000"] = case_collide_mask(5000)
+CASES["field_collide_hitbox_5000"] = case_field_collide_hitbox(5000)
+CASES["graze_loop_5000"] = case_graze_loop(5000)
+CASES["field_graze_5000"] = case_field_graze(5000)
+CASES["homing_search_200_enemies"] = case_homing_search(200)
+CASES["homing_search_1000_enemies"] = case_homing_search(1000)
+CASES["all_sprites_draw_5000"] = case_all_sprites_draw(5000)
+CASES["field_draw_5000"] = case_field_draw(5000)
+CASES["render_passes_5000"] = case_render_passes(5000)
+CASES["particles_2048"] = case_particles(2048)
+CASES["item_magnet_1000"] = case_item_magnet(1000)
+CASES["formation_move_steered"] = case_formation_move(baked=False)
+CASES["formation_move_baked"] = case_formation_move(baked=True)
+CASES["scheduler_10000_scripts"] = case_scheduler(10000)
+
+def time_case(setup, repeat, number):
+    """Median and best per-call time in milliseconds over `repeat` rounds of `number` calls, each round on a fresh scene."""
+    rounds = []
+    for r in range(repeat):
+        run = setup(random.Random(SEED + r))
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        rounds.append((time.perf_counter() - start) / number * 1000)
+    return {"median_ms": statistics.median(rounds), "best_ms": min(rounds)}
+
+def compare(results, baseline, tolerance):
+    """Names of cases whose median is slower than the baseline by more than `tolerance`."""
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result["median_ms"] > baseline[name]["median_ms"] * (1 + tolerance):
+            regressions.append(name)
+    return regressions
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-k", dest="pattern", default="", help="only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a case is flagged (0.25 = 25%%)")
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, setup in CASES.items():
+        if args.pattern in name:
+            results[name] = time_case(setup, args.repeat, args.number)
+            print(f"{name:32} {results[name]['median_ms']:9.3f} ms", file=sys.stderr)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(json.dumps({"results": results, "saved": args.baseline}, indent=2))
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    print(json.dumps({"results": results, "baseline": args.baseline if baseline else None,
+                      "tolerance": args.tolerance, "regressions": regressions}, indent=2))
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,109 @@
+"""
+Plays a stage headless from the first frame to the boss's death with a
+scripted or recorded input stream, and prints frames/sec plus per-phase
+timings (update, collision, graze, draw) as JSON.
+
+    python -m benchmarks.stage_bench --output bench_stage1.json
+    python -m benchmarks.stage_bench --script my_inputs.json --no-draw
+
+An input script is a JSON list of [frames, [key names]] segments, e.g.
+[[120, ["z", "left"]], [120, ["z", "right"]]], looped until the run ends.
+Key names are pygame's ("z", "left", "left shift", ...).
+"""
+import argparse
+import json
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import main
+from profiler import PhaseTimer
+from seeding import parse_seed
+
+# Fires constantly and sweeps back and forth along the bottom of the screen
+DEFAULT_SCRIPT = [[45, ["z", "left"]], [90, ["z", "right"]], [45, ["z", "left"]], [30, ["z", "left shift"]]]
+
+class ScriptedInput:
+    """Input source that plays back looping [frames, keys] segments."""
+    def __init__(self, script):
+        self.segments = []
+        for frames, names in script:
+            self.segments.append((frames, main.KeyState(pygame.key.key_code(name) for name in names)))
+        self.length = sum(frames for frames, _ in self.segments)
+
+    def __call__(self, frame_count):
+        t = (frame_count - 1) % self.length
+        for frames, keys in self.segments:
+            if t < frames:
+                return keys, ()
+            t -= frames
+
+def boss_defeated(session, start_stage):
+    stage = session.stage_manager.current_stage
+    return session.player.stage != start_stage or (stage.boss_spawned and not main.bosses)
+
+def run(input_source, max_frames, lives, draw=True, seed=0):
+    session = main.GameSession(headless=True, seed=seed)
+    session.player.lives = lives
+    session.timer = timer = PhaseTimer()
+    start_stage = session.player.stage
+    peak_enemy_bullets = 0
+    stage_events = peak_stage_events = 0
+
+    start = time.perf_counter()
+    while session.frame_count < max_frames:
+        keys, pressed = input_source(session.frame_count + 1)
+        session.step(keys, pressed)
+        if draw:
+            with timer.phase("draw"):
+                session.draw(main.game_surface)
+        peak_enemy_bullets = max(peak_enemy_bullets, len(main.enemy_bullets))
+        events = session.stage_manager.current_stage.scheduler.events
+        stage_events += events
+        peak_stage_events = max(peak_stage_events, events)
+        if session.game_over or boss_defeated(session, start_stage):
+            break
+    elapsed = time.perf_counter() - start
+
+    return {
+        "stage": start_stage,
+        "seed": seed,
+        "frames": session.frame_count,
+        "seconds": elapsed,
+        "fps": session.frame_count / elapsed if elapsed else 0.0,
+        "boss_defeated": boss_defeated(session, start_stage),
+        "game_over": session.game_over,
+        "score": session.player.score,
+        "peak_enemy_bullets": peak_enemy_bullets,
+        "stage_events": stage_events,
+        "peak_stage_events": peak_stage_events,
+        "phases": timer.summary(),
+    }
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--script", help="JSON input script; defaults to a built-in sweep-and-fire pattern")
+    parser.add_argument("--max-frames", type=int, default=20000)
+    parser.add_argument("--lives", type=int, default=1000, help="starting lives, high so the run reaches the boss")
+    parser.add_argument("--seed", type=parse_seed, default=0, help="RNG seed, fixed so runs are comparable")
+    parser.add_argument("--no-draw", action="store_true", help="skip the draw phase")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args(argv)
+
+    script = DEFAULT_SCRIPT
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+
+    report = run(ScriptedInput(script), args.max_frames, args.lives, draw=not args.no_draw, seed=args.seed)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,216 @@
+import numpy as np
+import pygame
+from array_field import ArrayField
+from Enemy import get_bullet_assets, get_bullet_hitbox
+from collision import hitbox_overlap
+from config import SCREEN_HEIGHT, SCREEN_WIDTH
+from render import blit_batch
+
+# Per-bullet flag bits
+ALIVE = 1
+GRAZED = 2
+# Masks that clear one flag bit without leaving the uint8 range
+CLEAR_ALIVE = np.uint8(~ALIVE & 0xFF)
+CLEAR_GRAZED = np.uint8(~GRAZED & 0xFF)
+
+class BulletRef:
+    """Sprite-like view of one bullet in a BulletField. Only valid until the field's next update()."""
+    __slots__ = ("field", "index")
+
+    def __init__(self, field, index):
+        self.field = field
+        self.index = index
+
+    @property
+    def bullet_type(self):
+        return self.field.type_names[self.field.type[self.index]]
+
+    @property
+    def image(self):
+        return self.field.images[self.field.type[self.index]]
+
+    @property
+    def rect(self):
+        return self.image.get_rect(center=(self.field.x[self.index], self.field.y[self.index]))
+
+    @property
+    def grazed(self):
+        return bool(self.field.flags[self.index] & GRAZED)
+
+    @grazed.setter
+    def grazed(self, value):
+        if value:
+            self.field.flags[self.index] |= GRAZED
+        else:
+            self.field.flags[self.index] &= CLEAR_GRAZED
+
+    def alive(self):
+        return bool(self.field.flags[self.index] & ALIVE)
+
+    def kill(self):
+        self.field.flags[self.index] &= CLEAR_ALIVE
+
+class BulletField(ArrayField):
+    """
+    Enemy bullets stored as contiguous NumPy arrays (structure-of-arrays)
+    instead of one Sprite each. Movement, off-screen culling and compaction
+    run as a handful of vectorized operations per frame. Killed bullets only
+    clear their ALIVE flag and are compacted away on the next update().
+    """
+    COLUMNS = (("x", float), ("y", float), ("vx", float), ("vy", float), ("type", np.int16), ("flags", np.uint8))
+
+    def __init__(self, capacity=4096):
+        self.count = 0
+        self.high_water = 0
+        self.type_ids = {}
+        self.type_names = []
+        self.images = []
+        self.half_w = np.zeros(0)
+        self.half_h = np.zeros(0)
+        # Per-type hitbox columns, indexed by type id like half_w/half_h
+        self.hitboxes = np.zeros((5, 0))
+        self.bounds = pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self._allocate(capacity)
+
+    def type_id(self, bullet_type):
+        type_id = self.type_ids.get(bullet_type)
+        if type_id is None:
+            image, _ = get_bullet_assets(bullet_type)
+            type_id = self.type_ids[bullet_type] = len(self.type_names)
+            self.type_names.append(bullet_type)
+            self.images.append(image)
+            self.half_w = np.append(self.half_w, image.get_width() / 2)
+            self.half_h = np.append(self.half_h, image.get_height() / 2)
+            self.hitboxes = np.column_stack((self.hitboxes, get_bullet_hitbox(bullet_type)))
+        return type_id
+
+    def spawn(self, x, y, speedx, speedy, bullet_type):
+        if self.count == self.capacity:
+            self._grow(self.count + 1)
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = speedx
+        self.vy[i] = speedy
+        self.type[i] = self.type_id(bullet_type)
+        self.flags[i] = ALIVE
+        self.count += 1
+        if self.count > self.high_water:
+            self.high_water = self.count
+
+    def spawn_many(self, x, y, speedx, speedy, bullet_type):
+        """Inserts a whole volley at once; each argument may be a scalar or a sequence of the volley's length."""
+        count = np.broadcast(x, y, speedx, speedy).size
+        if self.count + count > self.capacity:
+            self._grow(self.count + count)
+        i, j = self.count, self.count + count
+        self.x[i:j] = x
+        self.y[i:j] = y
+        self.vx[i:j] = speedx
+        self.vy[i:j] = speedy
+        self.type[i:j] = self.type_id(bullet_type)
+        self.flags[i:j] = ALIVE
+        self.count = j
+        if j > self.high_water:
+            self.high_water = j
+
+    def update(self, frame_count):
+        n = self.count
+        if n == 0:
+            return
+        x, y = self.x[:n], self.y[:n]
+        x += self.vx[:n]
+        y += self.vy[:n]
+
+        type_ids = self.type[:n]
+        half_w, half_h = self.half_w[type_ids], self.half_h[type_ids]
+        keep = (self.flags[:n] & ALIVE).astype(bool)
+        keep &= (x + half_w > self.bounds.left) & (x - half_w < self.bounds.right)
+        keep &= (y + half_h > self.bounds.top) & (y - half_h < self.bounds.bottom)
+        if not keep.all():
+            self._compact(keep)
+
+    def _topleft(self):
+        n = self.count
+        type_ids = self.type[:n]
+        left = np.floor(self.x[:n] - self.half_w[type_ids]).astype(int)
+        top = np.floor(self.y[:n] - self.half_h[type_ids]).astype(int)
+        return left, top
+
+    def draw(self, surface):
+        """Draws the live bullets and returns how many there were."""
+        n = self.count
+        if n == 0:
+            return 0
+        left, top = self._topleft()
+        alive = (self.flags[:n] & ALIVE).astype(bool)
+        images = self.images
+        return blit_batch(surface, [(images[t], (l, tp)) for t, l, tp in zip(self.type[:n][alive].tolist(), left[alive].tolist(), top[alive].tolist())])
+
+    def collide_hitbox(self, center, hitbox, dokill=True):
+        """Counts live bullets whose analytic hitbox overlaps `hitbox` placed at `center`. No masks involved."""
+        n = self.count
+        if n == 0:
+            return 0
+        type_ids = self.type[:n]
+        hw, hh, r, ox, oy = self.hitboxes[:, type_ids]
+        dx = self.x[:n] + ox - (center[0] + hitbox.ox)
+        dy = self.y[:n] + oy - (center[1] + hitbox.oy)
+        hit = hitbox_overlap(dx, dy, hw + hitbox.hw, hh + hitbox.hh, r + hitbox.r)
+        hit &= (self.flags[:n] & ALIVE).astype(bool)
+        if dokill:
+            self.flags[:n][hit] &= CLEAR_ALIVE
+        return int(np.count_nonzero(hit))
+
+    def graze(self, center, radius, report_min=False):
+        """
+        Marks every live, ungrazed bullet within `radius` of `center` as grazed
+        and returns how many were newly grazed. With report_min, returns
+        (count, distance to the nearest live bullet) instead.
+        """
+        n = self.count
+        if n == 0:
+            return (0, float("inf")) if report_min else 0
+        flags = self.flags[:n]
+        dx = self.x[:n] - center[0]
+        dy = self.y[:n] - center[1]
+        dist_sq = dx * dx + dy * dy
+        alive = (flags & ALIVE).astype(bool)
+        grazed = alive & ((flags & GRAZED) == 0) & (dist_sq < radius * radius)
+        flags[grazed] |= GRAZED
+        count = int(np.count_nonzero(grazed))
+        if report_min:
+            nearest = float(np.sqrt(dist_sq[alive].min())) if alive.any() else float("inf")
+            return count, nearest
+        return count
+
+    def live_positions(self):
+        """(x, y) arrays of the live bullets' centres."""
+        n = self.count
+        alive = (self.flags[:n] & ALIVE).astype(bool)
+        return self.x[:n][alive], self.y[:n][alive]
+
+    def empty(self):
+        self.count = 0
+
+    def snapshot(self):
+        return {"rows": super().snapshot(), "types": list(self.type_names), "high_water": self.high_water}
+
+    def restore(self, state):
+        # Type ids follow the order types were first used in, so map the snapshot's ids onto this field's
+        type_ids = [self.type_id(name) for name in state["types"]]
+        rows = state["rows"]
+        super().restore({**rows, "type": [type_ids[t] for t in rows["type"]]})
+        self.high_water = state["high_water"]
+
+    def sprites(self):
+        return [BulletRef(self, i) for i in np.flatnonzero(self.flags[:self.count] & ALIVE).tolist()]
+
+    def __iter__(self):
+        return iter(self.sprites())
+
+    def __len__(self):
+        return int(np.count_nonzero(self.flags[:self.count] & ALIVE))
+
+    def __bool__(self):
+        return len(self) > 0
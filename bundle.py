@@ -0,0 +1,137 @@
+"""
+Packed asset bundle: every image in media/ as display-format (BGRA) pixels,
+at its original size and at each pre-scaled size the screens use, plus
+every sound as PCM in the mixer's sample format. At runtime the bundle is
+memory-mapped and surfaces and sounds are created straight over the mapped
+bytes, so nothing is decoded or scaled.
+
+    python bundle.py                  # writes media.bundle
+    python bundle.py -o other.bundle
+
+Entries remember the size and mtime of their source file; an entry whose
+source has changed since the build is ignored and that asset is decoded
+from media/ as before.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import pygame
+
+MAGIC = b"AMBN"
+VERSION = 1
+HEADER = struct.Struct("<4sHII") # magic, version, index length, offset of the first blob
+ALIGN = 64
+BUNDLE_PATH = "media.bundle"
+
+def _align(offset, alignment):
+    return (offset + alignment - 1) // alignment * alignment
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {"source": path, "mtime_ns": stat.st_mtime_ns, "bytes": stat.st_size}
+
+class Bundle:
+    def __init__(self, path=BUNDLE_PATH):
+        self.file = open(path, "rb")
+        # Copy-on-write, so a stray draw onto a bundled surface cannot fault or reach the file
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_COPY)
+        self.view = memoryview(self.data)
+        magic, version, index_length, data_start = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} asset bundle")
+        index = json.loads(bytes(self.view[HEADER.size:HEADER.size + index_length]))
+        self.mixer = tuple(index["mixer"]) if index["mixer"] else None
+        self.entries = {}
+        self.stale = []
+        for entry in index["entries"]:
+            entry["offset"] += data_start
+            source = entry["source"]
+            if os.path.exists(source) and _source_stamp(source) == {k: entry[k] for k in ("source", "mtime_ns", "bytes")}:
+                variant = tuple(entry["variant"]) if entry["variant"] else None
+                self.entries[(entry["kind"], entry["key"], variant)] = entry
+            else:
+                self.stale.append(source)
+
+    @classmethod
+    def open_if_present(cls, path=BUNDLE_PATH):
+        return cls(path) if os.path.exists(path) else None
+
+    def _bytes(self, entry):
+        return self.view[entry["offset"]:entry["offset"] + entry["length"]]
+
+    def has(self, kind, key, variant=None):
+        if kind == "sound" and self.mixer != pygame.mixer.get_init():
+            return False
+        return (kind, key, variant) in self.entries
+
+    def image(self, key, size=None):
+        """A Surface over the mapped pixels of `key` at `size` (None for the original size), or None if not bundled."""
+        entry = self.entries.get(("image", key, size))
+        if entry is None:
+            return None
+        return pygame.image.frombuffer(self._bytes(entry), tuple(entry["size"]), "BGRA")
+
+    def sound(self, key):
+        """The bundled PCM as a Sound, or None if not bundled or recorded for a different mixer format."""
+        if not self.has("sound", key):
+            return None
+        return pygame.mixer.Sound(buffer=self._bytes(self.entries[("sound", key, None)]))
+
+def build_bundle(path=BUNDLE_PATH, images=None, sounds=None, variants=None):
+    """Decodes, scales and converts every asset once and writes them as one indexed file. Returns the index."""
+    from assets import IMAGES, SCALED_VARIANTS, SOUNDS
+    images = IMAGES if images is None else images
+    sounds = SOUNDS if sounds is None else sounds
+    variants = SCALED_VARIANTS if variants is None else variants
+
+    entries = []
+    blobs = []
+    offset = 0
+
+    def add(entry, blob):
+        nonlocal offset
+        entry.update(offset=offset, length=len(blob))
+        entries.append(entry)
+        blobs.append((offset, blob))
+        offset = _align(offset + len(blob), ALIGN)
+
+    for key, source in images.items():
+        surface = pygame.image.load(source)
+        for variant in [None] + list(variants.get(key, ())):
+            scaled = surface if variant is None else pygame.transform.scale(surface, variant)
+            add({"kind": "image", "key": key, "variant": variant, "size": scaled.get_size(), **_source_stamp(source)},
+                pygame.image.tobytes(scaled, "BGRA"))
+
+    mixer = pygame.mixer.get_init()
+    if mixer:
+        for key, source in sounds.items():
+            add({"kind": "sound", "key": key, "variant": None, **_source_stamp(source)}, pygame.mixer.Sound(source).get_raw())
+
+    index = json.dumps({"mixer": mixer, "entries": entries}).encode()
+    data_start = _align(HEADER.size + len(index), 4096)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(index), data_start))
+        f.write(index)
+        for blob_offset, blob in blobs:
+            f.seek(data_start + blob_offset)
+            f.write(blob)
+    return entries
+
+def cli(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Pack media/ into a memory-mappable asset bundle.")
+    parser.add_argument("-o", "--output", default=BUNDLE_PATH)
+    args = parser.parse_args(argv)
+
+    # Sounds are stored in the sample format main.py initialises the mixer with
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.mixer.pre_init(44100, -16, 2, 2048)
+    pygame.mixer.init()
+    entries = build_bundle(args.output)
+    print(f"{len(entries)} entries, {os.path.getsize(args.output) / 1e6:.1f} MB written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(cli())
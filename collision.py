@@ -0,0 +1,187 @@
+import numpy as np
+from collections import namedtuple
+
+# Collision shapes are axis-aligned rounded rectangles: a box of half extents
+# (hw, hh) grown by radius r, centred at offset (ox, oy) from the owner's
+# centre. That single form covers circles, boxes and vertical capsules, and
+# the Minkowski sum of two of them is another one, so any pair is tested
+# exactly with a few arithmetic operations.
+Hitbox = namedtuple("Hitbox", ["hw", "hh", "r", "ox", "oy"])
+
+def circle(radius, offset=(0, 0)):
+    return Hitbox(0, 0, radius, offset[0], offset[1])
+
+def rect(width, height, offset=(0, 0)):
+    return Hitbox(width / 2, height / 2, 0, offset[0], offset[1])
+
+def capsule(length, radius, offset=(0, 0)):
+    """Vertical capsule: a segment of `length` swept by `radius`."""
+    return Hitbox(0, length / 2, radius, offset[0], offset[1])
+
+def hitbox_overlap(dx, dy, hw, hh, r):
+    """
+    Tests the point (dx, dy) against a rounded rectangle centred on the
+    origin. Works on scalars and on NumPy arrays alike.
+    """
+    qx = np.abs(dx) - hw
+    qy = np.abs(dy) - hh
+    outside_x = np.maximum(qx, 0)
+    outside_y = np.maximum(qy, 0)
+    return ((qx < 0) & (qy < 0)) | (outside_x * outside_x + outside_y * outside_y < r * r)
+
+def hitboxes_collide(center_a, box_a, center_b, box_b):
+    dx = (center_b[0] + box_b.ox) - (center_a[0] + box_a.ox)
+    dy = (center_b[1] + box_b.oy) - (center_a[1] + box_a.oy)
+    return bool(hitbox_overlap(dx, dy, box_a.hw + box_b.hw, box_a.hh + box_b.hh, box_a.r + box_b.r))
+
+class SpatialHash:
+    """
+    Uniform grid that maps each cell to the sprites whose rects touch it.
+    Rebuilt once per frame from a group, then queried by rect, by column or
+    for the nearest sprite, so that cost follows local density rather than
+    group sizes. Sprites killed after the rebuild are skipped by every query.
+    """
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.columns = {}
+        self.order = {}
+        self.bounds = None # (min cx, min cy, max cx, max cy) of the occupied cells
+
+    def clear(self):
+        self.cells.clear()
+        self.columns.clear()
+        self.order.clear()
+        self.bounds = None
+
+    def _span(self, lo, hi):
+        # Cell indices covered by the half-open pixel range [lo, hi)
+        return range(lo // self.cell_size, (max(hi, lo + 1) - 1) // self.cell_size + 1)
+
+    def insert(self, sprite):
+        rect = sprite.rect
+        self.order[sprite] = len(self.order)
+        xs = self._span(rect.left, rect.right)
+        ys = self._span(rect.top, rect.bottom)
+        for cx in xs:
+            self.columns.setdefault(cx, []).append(sprite)
+            for cy in ys:
+                self.cells.setdefault((cx, cy), []).append(sprite)
+        if self.bounds is None:
+            self.bounds = (xs[0], ys[0], xs[-1], ys[-1])
+        else:
+            min_cx, min_cy, max_cx, max_cy = self.bounds
+            self.bounds = (min(min_cx, xs[0]), min(min_cy, ys[0]), max(max_cx, xs[-1]), max(max_cy, ys[-1]))
+
+    def rebuild(self, sprites):
+        self.clear()
+        for sprite in sprites:
+            self.insert(sprite)
+
+    def query_rect(self, rect):
+        """Returns the indexed sprites whose rects collide with `rect`."""
+        found = []
+        seen = set()
+        cells = self.cells
+        for cx in self._span(rect.left, rect.right):
+            for cy in self._span(rect.top, rect.bottom):
+                for sprite in cells.get((cx, cy), ()):
+                    if sprite not in seen:
+                        seen.add(sprite)
+                        if rect.colliderect(sprite.rect) and sprite.alive():
+                            found.append(sprite)
+        return found
+
+    def query_column(self, left, right, top=None, bottom=None):
+        """Returns the indexed sprites overlapping the x range [left, right), optionally limited to [top, bottom)."""
+        found = []
+        seen = set()
+        for cx in self._span(left, right):
+            for sprite in self.columns.get(cx, ()):
+                if sprite in seen:
+                    continue
+                seen.add(sprite)
+                rect = sprite.rect
+                if rect.right <= left or rect.left >= right:
+                    continue
+                if top is not None and rect.bottom <= top:
+                    continue
+                if bottom is not None and rect.top >= bottom:
+                    continue
+                if sprite.alive():
+                    found.append(sprite)
+        return found
+
+    def nearest(self, point):
+        """
+        Returns the live indexed sprite whose rect centre is closest to
+        `point`, or None. Cells are searched in rings of growing distance
+        from the point's cell and the search stops once no unvisited cell can
+        hold anything closer, so the cost follows the distance to the nearest
+        sprite rather than how many are indexed. Ties go to the sprite indexed
+        first, as a linear scan of the group would pick. Assumes the sprites
+        have not moved since the rebuild, so query between rebuild and the
+        next movement.
+        """
+        if self.bounds is None:
+            return None
+        size = self.cell_size
+        px, py = point
+        cx, cy = int(px // size), int(py // size)
+        min_cx, min_cy, max_cx, max_cy = self.bounds
+        last_ring = max(cx - min_cx, max_cx - cx, cy - min_cy, max_cy - cy)
+        cells = self.cells
+        order = self.order
+        best = None
+        best_key = None
+        for ring in range(max(last_ring, 0) + 1):
+            if ring == 0:
+                ring_cells = [(cx, cy)]
+            else:
+                ring_cells = [(x, y) for x in range(cx - ring, cx + ring + 1) for y in (cy - ring, cy + ring)]
+                ring_cells += [(x, y) for y in range(cy - ring + 1, cy + ring) for x in (cx - ring, cx + ring)]
+            for cell in ring_cells:
+                for sprite in cells.get(cell, ()):
+                    if not sprite.alive():
+                        continue
+                    dx = sprite.rect.centerx - px
+                    dy = sprite.rect.centery - py
+                    key = (dx * dx + dy * dy, order[sprite])
+                    if best_key is None or key < best_key:
+                        best, best_key = sprite, key
+            # Every sprite's centre lies in a cell it was indexed under, so
+            # nothing unvisited is closer than the edge of the searched square
+            if best_key is not None:
+                edge = min(px - (cx - ring) * size, (cx + ring + 1) * size - px,
+                           py - (cy - ring) * size, (cy + ring + 1) * size - py)
+                if best_key[0] < edge * edge:
+                    break
+        return best
+
+    def collide_group(self, group, dokill=False):
+        """
+        Pairs every sprite in `group` with the indexed sprites it overlaps,
+        returning {indexed_sprite: [group sprites]} like pygame.sprite.groupcollide.
+        With dokill, each hit sprite is killed and credited to the first
+        indexed sprite it overlaps, matching groupcollide's iteration order.
+        """
+        hits = {}
+        for sprite in group.sprites():
+            targets = self.query_rect(sprite.rect)
+            if not targets:
+                continue
+            if dokill:
+                targets = [min(targets, key=self.order.__getitem__)]
+                sprite.kill()
+            for target in targets:
+                hits.setdefault(target, []).append(sprite)
+        return hits
+
+    def collide_columns(self, group):
+        """Like collide_group, for tall column-shaped sprites such as beams."""
+        hits = {}
+        for sprite in group.sprites():
+            rect = sprite.rect
+            for target in self.query_column(rect.left, rect.right, rect.top, rect.bottom):
+                hits.setdefault(target, []).append(sprite)
+        return hits
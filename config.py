@@ -8,6 +8,10 @@ class Settings:
     def __init__(self):
         self.music_volume = 1.0
         self.sfx_volume = 1.0
+        self.display_mode = "Windowed"
+        self.scaling = "aspect" # "aspect", "integer" or "stretch"
+        self.software_renderer = False
+        self.record_replays = False # Writes each session's replay to replays/
         self.load()
 
     def load(self):
@@ -16,6 +20,10 @@ class Settings:
                 settings = json.load(f)
                 self.music_volume = settings.get("music_volume", 1.0)
                 self.sfx_volume = settings.get("sfx_volume", 1.0)
+                self.display_mode = settings.get("display_mode", "Windowed")
+                self.scaling = settings.get("scaling", "aspect")
+                self.software_renderer = settings.get("software_renderer", False)
+                self.record_replays = settings.get("record_replays", False)
         except FileNotFoundError:
             pass
 
@@ -23,7 +31,11 @@ class Settings:
         with open("settings.json", "w") as f:
             json.dump({
                 "music_volume": self.music_volume,
-                "sfx_volume": self.sfx_volume
+                "sfx_volume": self.sfx_volume,
+                "display_mode": self.display_mode,
+                "scaling": self.scaling,
+                "software_renderer": self.software_renderer,
+                "record_replays": self.record_replays
             }, f)
 
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,46 @@
+import math
+from functools import lru_cache
+import numpy as np
+from seeding import streams
+
+@lru_cache(maxsize=None)
+def ring_table(count):
+    """Unit vectors for `count` bullets evenly spaced around a full circle, starting at angle 0."""
+    angles = np.arange(count) * (2 * math.pi / count)
+    return np.cos(angles), np.sin(angles)
+
+@lru_cache(maxsize=None)
+def arc_table(count, spread):
+    """Unit vectors for `count` bullets `spread` radians apart, centred on angle 0."""
+    angles = (np.arange(count) - (count - 1) / 2) * spread
+    return np.cos(angles), np.sin(angles)
+
+def _rotate(table, angle, speed):
+    cos_table, sin_table = table
+    c, s = math.cos(angle) * speed, math.sin(angle) * speed
+    return cos_table * c - sin_table * s, sin_table * c + cos_table * s
+
+def ring(field, x, y, count, speed, bullet_type, angle=0.0):
+    """Fires `count` bullets evenly around a circle, the first one at `angle`."""
+    vx, vy = _rotate(ring_table(count), angle, speed)
+    field.spawn_many(x, y, vx, vy, bullet_type)
+
+def arc(field, x, y, count, speed, bullet_type, angle, spread):
+    """Fires `count` bullets `spread` radians apart, centred on `angle`."""
+    vx, vy = _rotate(arc_table(count, spread), angle, speed)
+    field.spawn_many(x, y, vx, vy, bullet_type)
+
+def aimed_spread(field, x, y, target, count, speed, bullet_type, spread=0.0, jitter=0.0):
+    """Fires an arc centred on `target`. A non-zero jitter adds a random angle in [-jitter, jitter] to each bullet."""
+    angle = math.atan2(target[1] - y, target[0] - x)
+    if not jitter:
+        arc(field, x, y, count, speed, bullet_type, angle, spread)
+        return
+    angles = angle + (np.arange(count) - (count - 1) / 2) * spread + streams.bullets.uniform(-jitter, jitter, count)
+    field.spawn_many(x, y, np.cos(angles) * speed, np.sin(angles) * speed, bullet_type)
+
+def random_burst(field, x, y, count, speed_range, bullet_type):
+    """Fires `count` bullets in random directions with speeds drawn from `speed_range`."""
+    angles = streams.bullets.uniform(0, 2 * math.pi, count)
+    speeds = streams.bullets.uniform(speed_range[0], speed_range[1], count)
+    field.spawn_many(x, y, np.cos(angles) * speeds, np.sin(angles) * speeds, bullet_type)
@@ -0,0 +1,89 @@
+import pygame
+from Enemy import Enemy
+from config import SCREEN_HEIGHT, SCREEN_WIDTH
+
+# Baking carries on until the path has left this much beyond the screen
+OFFSCREEN_MARGIN = 100
+_baked_paths = {}
+
+def _state(enemy):
+    """Everything Enemy.move reads or changes, as a hashable tuple."""
+    return (enemy.position.x, enemy.position.y, enemy.velocity.x, enemy.velocity.y, enemy.speed,
+            enemy.current_waypoint_index, enemy.fast_entry, enemy.decelerating)
+
+class BakedPath:
+    """
+    Per-frame table of a waypoint path: entry i is where an enemy is after i
+    calls to Enemy.move. Baking runs the real Enemy.move, fast-entry
+    deceleration included, so following the table is exact. An enemy can
+    join at any frame whose state matches its own starting state, which is
+    how enemies queued behind each other on the same route share one table.
+    `key` holds the bake_path arguments that reproduce the table.
+    """
+    def __init__(self, x, y, waypoints, speed, fast_entry, screen_height, max_frames):
+        self.key = (x, y, tuple(waypoints), speed, fast_entry, screen_height)
+        walker = Enemy(x, y, None, None, None, screen_height, waypoints=waypoints, speed=speed, fast_entry=fast_entry)
+        bounds = pygame.Rect(0, 0, SCREEN_WIDTH, screen_height).inflate(2 * OFFSCREEN_MARGIN, 2 * OFFSCREEN_MARGIN)
+        self.states = [_state(walker)]
+        for _ in range(max_frames):
+            walker.move(0)
+            self.states.append(_state(walker))
+            settled = walker.current_waypoint_index >= len(waypoints) and not walker.fast_entry and not walker.decelerating
+            if settled and not bounds.collidepoint(walker.position):
+                break
+        self.positions = [state[:2] for state in self.states]
+        self.frames = {}
+        for frame, state in enumerate(self.states):
+            self.frames.setdefault(state, frame)
+
+    def frame_of(self, enemy):
+        """The frame at which `enemy`'s current state appears in the table, or None."""
+        return self.frames.get(_state(enemy))
+
+    def restore(self, enemy, frame):
+        """Puts `enemy` in the state baked for `frame`, so Enemy.move can carry on live from there."""
+        x, y, vx, vy, speed, waypoint_index, fast_entry, decelerating = self.states[frame]
+        enemy.position.update(x, y)
+        enemy.rect.center = enemy.position
+        enemy.velocity.update(vx, vy)
+        enemy.speed = speed
+        enemy.current_waypoint_index = waypoint_index
+        enemy.fast_entry = fast_entry
+        enemy.decelerating = decelerating
+
+def bake_path(x, y, waypoints, speed=1, fast_entry=False, screen_height=SCREEN_HEIGHT, max_frames=1800):
+    """Returns the shared BakedPath for an enemy starting at (x, y), baking it on first use."""
+    key = (x, y, tuple(waypoints), speed, fast_entry, screen_height)
+    path = _baked_paths.get(key)
+    if path is None:
+        path = _baked_paths[key] = BakedPath(x, y, waypoints, speed, fast_entry, screen_height, max_frames)
+    return path
+
+def bake_formation(enemy_infos, screen_height=SCREEN_HEIGHT):
+    """
+    Bakes the paths for a wave's enemy definitions (dicts with x, y,
+    waypoints and optionally speed and fast_entry) and stores each one's
+    (BakedPath, starting frame) under "path". Enemies on the same route are
+    tried against the path of the one furthest back before getting a table
+    of their own, so a column of six costs one bake.
+    """
+    routes = {}
+    for info in enemy_infos:
+        if info.get("waypoints"):
+            route = (tuple(info["waypoints"]), info.get("speed", 1), info.get("fast_entry", False))
+            routes.setdefault(route, []).append(info)
+
+    for (waypoints, speed, fast_entry), infos in routes.items():
+        first_x, first_y = waypoints[0]
+        infos = sorted(infos, key=lambda info: -((info["x"] - first_x) ** 2 + (info["y"] - first_y) ** 2))
+        paths = []
+        for info in infos:
+            start = Enemy(info["x"], info["y"], None, None, None, screen_height, waypoints=list(waypoints), speed=speed, fast_entry=fast_entry)
+            for path in paths:
+                frame = path.frame_of(start)
+                if frame is not None:
+                    break
+            else:
+                path, frame = bake_path(info["x"], info["y"], waypoints, speed, fast_entry, screen_height), 0
+                paths.append(path)
+            info["path"] = (path, frame)
@@ -0,0 +1,167 @@
+import numpy as np
+import pygame
+from array_field import ArrayField
+from config import SCREEN_HEIGHT
+from render import blit_batch
+
+# Item kinds: `stat` is the Player attribute a pickup adds its value to.
+# Items worth more than 1 (merged ones) are drawn with the larger image.
+ITEM_KINDS = {
+    "power": {"stat": "power", "color": (0, 0, 255), "size": 10, "merged_size": 16, "fall_speed": 2},
+}
+_item_images = {}
+
+def get_item_images(kind):
+    """Returns the shared (single, merged) images for an item kind, building them on first use."""
+    images = _item_images.get(kind)
+    if images is None:
+        spec = ITEM_KINDS[kind]
+        single = pygame.Surface((spec["size"], spec["size"]))
+        single.fill(spec["color"])
+        merged = pygame.Surface((spec["merged_size"], spec["merged_size"]))
+        merged.fill((255, 255, 255))
+        merged.fill(spec["color"], merged.get_rect().inflate(-4, -4))
+        if pygame.display.get_surface() is not None:
+            single, merged = single.convert(), merged.convert()
+        images = _item_images[kind] = (single, merged)
+    return images
+
+class ItemField(ArrayField):
+    """
+    Collectible items as a position, kind and value per row. Falling, the
+    magnet pull towards the player and the pickup test are each one
+    vectorized pass. Once more than `cap` items are on screen, items of the
+    same kind that share a grid cell of `merge_distance` are merged into one
+    item worth their sum, so a big drop or score chain leaves a bounded
+    number of items without losing any value.
+    """
+    COLUMNS = (("x", float), ("y", float), ("kind", np.int16), ("value", np.int64))
+
+    def __init__(self, cap=128, merge_distance=24, capacity=256):
+        self.cap = cap
+        self.merge_distance = merge_distance
+        self.count = 0
+        self.merges = 0
+        self.kind_ids = {}
+        self.kind_names = []
+        self.images = [] # (single, merged) per kind id
+        self.half_size = np.zeros((0, 2))
+        self.fall_speed = np.zeros(0)
+        self._allocate(capacity)
+
+    def kind_id(self, kind):
+        kind_id = self.kind_ids.get(kind)
+        if kind_id is None:
+            spec = ITEM_KINDS[kind]
+            kind_id = self.kind_ids[kind] = len(self.kind_names)
+            self.kind_names.append(kind)
+            self.images.append(get_item_images(kind))
+            self.half_size = np.vstack((self.half_size, (spec["size"] / 2, spec["merged_size"] / 2)))
+            self.fall_speed = np.append(self.fall_speed, spec["fall_speed"])
+        return kind_id
+
+    def spawn(self, x, y, kind, count=1, value=1):
+        """Drops `count` items of `kind` at (x, y)."""
+        if self.count + count > self.capacity:
+            self._grow(self.count + count)
+        i, j = self.count, self.count + count
+        self.x[i:j] = x
+        self.y[i:j] = y
+        self.kind[i:j] = self.kind_id(kind)
+        self.value[i:j] = value
+        self.count = j
+
+    def _sizes(self, n):
+        """Half the side length of each item, which depends on whether it has been merged."""
+        return self.half_size[self.kind[:n], (self.value[:n] > 1).astype(int)]
+
+    def update(self, frame_count):
+        n = self.count
+        if n == 0:
+            return
+        self.y[:n] += self.fall_speed[self.kind[:n]]
+        keep = self.y[:n] - self._sizes(n) <= SCREEN_HEIGHT
+        if not keep.all():
+            self._compact(keep)
+        if self.count > self.cap:
+            self.coalesce()
+
+    def coalesce(self):
+        """Merges same-kind items sharing a grid cell, doubling the cell size until no more than `cap` remain."""
+        cell = self.merge_distance
+        while self.count > self.cap:
+            n = self.count
+            kind, value = self.kind[:n], self.value[:n]
+            cells = np.column_stack((kind, np.floor(self.x[:n] / cell), np.floor(self.y[:n] / cell)))
+            _, first, group = np.unique(cells, axis=0, return_index=True, return_inverse=True)
+            group = group.ravel()
+            # Each merged item sits at the value-weighted centre of the items it replaces
+            total = np.bincount(group, weights=value)
+            x = np.bincount(group, weights=self.x[:n] * value) / total
+            y = np.bincount(group, weights=self.y[:n] * value) / total
+            merged = len(total)
+            self.x[:merged] = x
+            self.y[:merged] = y
+            self.kind[:merged] = kind[first]
+            self.value[:merged] = total
+            self.merges += n - merged
+            self.count = merged
+            cell *= 2
+
+    def attract(self, target, rate=0.1):
+        """Moves every item `rate` of the way towards `target`: the point-of-collection magnet."""
+        n = self.count
+        self.x[:n] += (target[0] - self.x[:n]) * rate
+        self.y[:n] += (target[1] - self.y[:n]) * rate
+
+    def collect(self, rect):
+        """Removes every item touching `rect` and returns {stat: total value} for what was picked up."""
+        n = self.count
+        if n == 0:
+            return {}
+        half = self._sizes(n)
+        x, y = self.x[:n], self.y[:n]
+        hit = (x - half < rect.right) & (x + half > rect.left) & (y - half < rect.bottom) & (y + half > rect.top)
+        if not hit.any():
+            return {}
+        totals = np.bincount(self.kind[:n][hit], weights=self.value[:n][hit], minlength=len(self.kind_names))
+        collected = {}
+        for kind, total in zip(self.kind_names, totals.tolist()):
+            if total:
+                stat = ITEM_KINDS[kind]["stat"]
+                collected[stat] = collected.get(stat, 0) + int(total)
+        self._compact(~hit)
+        return collected
+
+    def draw(self, surface):
+        """Draws every item, merged ones with the larger image."""
+        n = self.count
+        if n == 0:
+            return 0
+        merged = (self.value[:n] > 1).astype(int)
+        half = self._sizes(n)
+        left = np.floor(self.x[:n] - half).astype(int)
+        top = np.floor(self.y[:n] - half).astype(int)
+        images = self.images
+        return blit_batch(surface, [(images[k][m], (l, t)) for k, m, l, t in zip(self.kind[:n].tolist(), merged.tolist(), left.tolist(), top.tolist())])
+
+    def total_value(self):
+        return int(self.value[:self.count].sum())
+
+    def empty(self):
+        self.count = 0
+
+    def snapshot(self):
+        return {"rows": super().snapshot(), "kinds": list(self.kind_names), "merges": self.merges}
+
+    def restore(self, state):
+        kind_ids = [self.kind_id(kind) for kind in state["kinds"]]
+        rows = state["rows"]
+        super().restore({**rows, "kind": [kind_ids[k] for k in rows["kind"]]})
+        self.merges = state["merges"]
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
@@ -1,19 +1,41 @@
+import os
+import sys
+
+# Headless runs use SDL's dummy drivers; they must be chosen before pygame starts
+if "--headless" in sys.argv:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
 import pygame
-import random
 import math
 import json
-import os
-from Enemy import Bullet, HomingMissile
+import time
+import zlib
+import numpy as np
+from Enemy import Bullet, BulletPool, HomingMissile, EnemyTypeA, EnemyTypeB, EnemyTypeC, Miniboss, BossTypeA, get_bullet_assets
+from bullet_field import BulletField
+from collision import SpatialHash, circle, rect
 from stages.stage1 import Stage1, Stage2, Stage3, Stage4, Stage5, Stage6, Stage7
 from config import SCREEN_WIDTH, SCREEN_HEIGHT, UI_WIDTH, settings
+from profiler import NULL_TIMER, FrameProfiler, ProfilerOverlay
+from replay import ReplayRecorder, decode_input, encode_input
+from seeding import parse_seed, streams
+from snapshot import decode_attrs, encode_attrs
+from text_cache import get_font, match_font, text_cache
+from assets import SoundTable, assets
+from items import ItemField
+from particles import ParticleSystem
+from render import RenderPasses
+from presenter import DISPLAY_MODES, SCALING_MODES, Presenter, close_events_to_quit
 
 pygame.mixer.pre_init(44100, -16, 2, 2048)
 pygame.init()
 pygame.mixer.init()
 
-# Screen dimensions
-NATIVE_WIDTH = 800
-NATIVE_HEIGHT = 600
+# Simulation rate
+FPS = 60
+FRAME_TIME = 1000 / FPS
+MAX_STEPS_PER_RENDER = 5
 
 # Colors
 BLACK = (0, 0, 0)
@@ -22,26 +44,19 @@ RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 BLUE = (0, 0, 255)
 
-# Create the screen
-screen = pygame.display.set_mode((NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT))
-render_surface = pygame.Surface((SCREEN_WIDTH + UI_WIDTH, SCREEN_HEIGHT))
+# Create the window; every screen draws into render_surface and calls presenter.present()
+FRAME_SIZE = (SCREEN_WIDTH + UI_WIDTH, SCREEN_HEIGHT)
+presenter = Presenter(FRAME_SIZE, "Aetherium Machina", settings.display_mode, settings.scaling,
+                      settings.software_renderer)
+render_surface = presenter.frame
 game_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Aetherium Machina")
 
-font_name = pygame.font.match_font('arial')
+font_name = match_font('arial')
 
-sfx = {
-    "death": pygame.mixer.Sound("media/sfx/death.wav"),
-    "select": pygame.mixer.Sound("media/sfx/Select.wav"),
-    "start_game": pygame.mixer.Sound("media/sfx/startNewGame.wav"),
-    "shooting": pygame.mixer.Sound("media/sfx/rapidFireLoop.wav"),
-    "beam": pygame.mixer.Sound("media/sfx/Laser.wav"),
-    "error": pygame.mixer.Sound("media/sfx/Error.wav")
-}
+sfx = SoundTable(assets)
 
 def set_sfx_volume(volume):
-    for sound in sfx.values():
-        sound.set_volume(volume)
+    assets.set_sfx_volume(volume)
 
 set_sfx_volume(settings.sfx_volume)
 pygame.mixer.music.set_volume(settings.music_volume)
@@ -50,9 +65,16 @@ pygame.mixer.music.set_volume(settings.music_volume)
 
 SAVE_FILE = "savegame.json"
 
+# Player hurtboxes: the small focus box drawn by draw_hitbox, and a circle for
+# the spinning ship body when unfocused (the rotation leaves it unchanged)
+FOCUS_HITBOX = rect(12, 12)
+BODY_HITBOX = circle(20)
+
+# The ship spins by a fixed step each frame, so every rotation is baked up front
+ROTATION_STEP = 5
+
 def draw_text(surf, text, size, x, y):
-    font = pygame.font.Font(font_name, size)
-    text_surface = font.render(text, True, WHITE)
+    text_surface = text_cache.render(text, font_name, size, WHITE)
     text_rect = text_surface.get_rect()
     text_rect.midtop = (x, y)
     surf.blit(text_surface, text_rect)
@@ -66,11 +88,11 @@ class Weapon:
         pass
 
 class WeaponManager:
-    def __init__(self, player, enemies):
+    def __init__(self, player, targets):
         self.player = player
         self.weapons = {
             "active": [DefaultWeapon(), BeamCannon()],
-            "passive": [HomingMissiles(enemies)]
+            "passive": [HomingMissiles(targets)]
         }
         self.active_weapon_index = 0
 
@@ -119,21 +141,19 @@ class WeaponUI:
 
             # Draw weapon name
             font_size = 20 if is_selected else 16
-            font = pygame.font.Font(font_name, font_size)
             if weapon.weapon_type == "passive":
                 text_color = (150, 150, 150)
                 type_text_color = (150, 150, 150)
             else:
                 text_color = WHITE
                 type_text_color = WHITE
-            text = font.render(weapon.name, True, text_color)
+            text = text_cache.render(weapon.name, font_name, font_size, text_color)
             text_rect = text.get_rect(center=(x, y))
             surface.blit(text, text_rect)
 
             # Draw A or P
             type_text_content = "A" if weapon.weapon_type == "active" else "P"
-            type_font = pygame.font.Font(font_name, 12)
-            type_text = type_font.render(type_text_content, True, type_text_color)
+            type_text = text_cache.render(type_text_content, font_name, 12, type_text_color)
             type_text_rect = type_text.get_rect(center=(x, y + 30))
             surface.blit(type_text, type_text_rect)
 
@@ -147,13 +167,13 @@ class DefaultWeapon(Weapon):
             if not pygame.mixer.Channel(0).get_busy():
                 pygame.mixer.Channel(0).play(player.shooting_sound)
             if player.focused:
-                all_sprites.add(Bullet(player.rect.centerx, player.rect.top, 0, -10, "player"))
-                bullets.add(all_sprites.sprites()[-1])
+                shots = [bullet_pool.acquire(player.rect.centerx, player.rect.top, 0, -10, "player")]
             else:
-                all_sprites.add(Bullet(player.rect.centerx, player.rect.top, 0, -7, "player"),
-                                Bullet(player.rect.left, player.rect.centery, -2, -7, "player"),
-                                Bullet(player.rect.right, player.rect.centery, 2, -7, "player"))
-                bullets.add(all_sprites.sprites()[-3:])
+                shots = [bullet_pool.acquire(player.rect.centerx, player.rect.top, 0, -7, "player"),
+                         bullet_pool.acquire(player.rect.left, player.rect.centery, -2, -7, "player"),
+                         bullet_pool.acquire(player.rect.right, player.rect.centery, 2, -7, "player")]
+            all_sprites.add(shots)
+            bullets.add(shots)
 
 class Beam(pygame.sprite.Sprite):
     def __init__(self, x, y, frame_count):
@@ -184,28 +204,29 @@ class BeamCannon(Weapon):
 
 
 class HomingMissiles(Weapon):
-    def __init__(self, enemies):
+    def __init__(self, targets):
         super().__init__("Homing Missiles", "passive")
         self.last_shot = 0
         self.shoot_delay = 120
-        self.enemies = enemies
+        self.targets = targets
 
     def shoot(self, player, frame_count):
         if frame_count - self.last_shot > self.shoot_delay:
             self.last_shot = frame_count
-            missile1 = HomingMissile(player.rect.left, player.rect.centery, -2, -7, self.enemies)
-            missile2 = HomingMissile(player.rect.right, player.rect.centery, 2, -7, self.enemies)
+            # Half an interval apart, so the pair never searches for targets on the same frame
+            missile1 = HomingMissile(player.rect.left, player.rect.centery, -2, -7, self.targets, phase=0)
+            missile2 = HomingMissile(player.rect.right, player.rect.centery, 2, -7, self.targets, phase=HomingMissile.RETARGET_INTERVAL // 2)
             all_sprites.add(missile1, missile2)
             bullets.add(missile1, missile2)
+            homing_missiles.add(missile1, missile2)
 
 class Player(pygame.sprite.Sprite):
-    def __init__(self, enemies):
+    def __init__(self, targets):
         super().__init__()
-        self.original_image = pygame.image.load("media/images/robin.webp").convert()
-        self.original_image.set_colorkey(WHITE)
-        self.image = pygame.transform.scale(self.original_image, (40, 40))
+        self.image = assets.image("player", alpha=False, size=(40, 40)).copy()
+        self.image.set_colorkey(WHITE)
         self.image_orig = self.image.copy()
-        self.mask = pygame.mask.from_surface(self.image)
+        self.bake_rotation_frames()
         self.flicker_interval = 150
         self.i_frame_duration = 3000
         self.rect = self.image.get_rect()
@@ -213,6 +234,7 @@ class Player(pygame.sprite.Sprite):
         self.rect.center = self.position
         self.speed = 7.5
         self.focused = False
+        self.hitbox = BODY_HITBOX
         self.last_shot = 0
         self.shoot_delay = 6
         self.lives = 3
@@ -224,29 +246,27 @@ class Player(pygame.sprite.Sprite):
         self.invincible_timer = 0
         self.stage = 1
         self.shooting_sound = sfx["shooting"]
-        self.weapon_manager = WeaponManager(self, enemies)
+        self.weapon_manager = WeaponManager(self, targets)
         self.weapon_ui = WeaponUI(self.weapon_manager)
         self.angle = 0
+        self.keys = KeyState()
+
+    def bake_rotation_frames(self):
+        """Pre-renders every rotation of the ship. Hits use the analytic hitboxes, so no masks are needed."""
+        self.rotation_frames = [pygame.transform.rotate(self.image_orig, angle) for angle in range(0, 360, ROTATION_STEP)]
 
     def update(self, frame_count):
-        self.angle = (self.angle + 5) % 360
-        new_image = pygame.transform.rotate(self.image_orig, self.angle)
+        self.angle = (self.angle + ROTATION_STEP) % 360
+        frame = self.angle // ROTATION_STEP
         old_center = self.rect.center
-        self.image = new_image
+        self.image = self.rotation_frames[frame]
         self.rect = self.image.get_rect()
         self.rect.center = old_center
 
-        keys = pygame.key.get_pressed()
+        keys = self.keys
         self.speed = 2.5 if keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT] else 7.5
         self.focused = keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]
-
-        if self.focused:
-            hitbox_surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
-            pygame.draw.rect(hitbox_surface, (255, 255, 255, 255), (self.rect.width // 2 - 6, self.rect.height // 2 - 6, 12, 12))
-            self.mask = pygame.mask.from_surface(hitbox_surface)
-        else:
-            self.mask = pygame.mask.from_surface(self.image)
-        self.focused = keys[pygame.K_LSHIFT] or keys[pygame.K_RSHIFT]
+        self.hitbox = FOCUS_HITBOX if self.focused else BODY_HITBOX
 
         if keys[pygame.K_UP] and self.rect.top > 0:
             self.position.y -= self.speed
@@ -288,21 +308,20 @@ class Player(pygame.sprite.Sprite):
         if self.bombs > 0:
             self.bombs -= 1
             for enemy in enemies:
+                particles.emit(*enemy.rect.center, "pop")
+                particles.burst(*enemy.rect.center, "spark", 6, 3)
                 enemy.kill()
-            for bullet in enemy_bullets:
-                bullet.kill()
+            particles.emit(*enemy_bullets.live_positions(), "spark")
+            enemy_bullets.empty()
 
     def die(self, frame_count):
         self.lives -= 1
         pygame.mixer.Channel(1).play(sfx["death"])
-        explosion = Explosion(self.rect.center, frame_count)
-        all_sprites.add(explosion)
+        particles.emit(*self.rect.center, "explosion")
         power_to_drop = int(self.power * 0.25)
         self.power -= power_to_drop
-        for _ in range(power_to_drop):
-            powerup = PowerUp(self.rect.center)
-            all_sprites.add(powerup)
-            powerups.add(powerup)
+        if power_to_drop:
+            items.spawn(*self.rect.center, "power", power_to_drop)
         self.rect.centerx = SCREEN_WIDTH / 2
         self.rect.bottom = SCREEN_HEIGHT - 10
         self.invincible = True
@@ -329,54 +348,19 @@ class StageManager:
     def update(self, frame_count):
         self.current_stage.update(frame_count)
         if self.current_stage.stage_complete:
-            self.next_stage()
+            self.next_stage(frame_count)
 
-    def next_stage(self):
+    def next_stage(self, frame_count):
         self.current_stage_index += 1
         self.player.stage += 1
         if self.current_stage_index < len(self.stages):
-            self.current_stage = self.stages[self.current_stage_index](self.player, self.all_sprites, self.enemies, self.enemy_bullets, self.bosses)
+            self.current_stage = self.stages[self.current_stage_index](self.player, self.all_sprites, self.enemies, self.enemy_bullets, self.bosses, frame_count)
         else:
             print("Game complete!") # Placeholder
 
-class PowerUp(pygame.sprite.Sprite):
-    def __init__(self, center):
-        super().__init__()
-        self.image = pygame.Surface((10, 10))
-        self.image.fill(BLUE)
-        self.rect = self.image.get_rect()
-        self.rect.center = center
-        self.speedy = 2
-
-    def update(self, frame_count):
-        self.rect.y += self.speedy
-        if self.rect.top > SCREEN_HEIGHT:
-            self.kill()
-
-class Explosion(pygame.sprite.Sprite):
-    def __init__(self, center, frame_count):
-        super().__init__()
-        self.image = pygame.Surface((50, 50), pygame.SRCALPHA)
-        self.rect = self.image.get_rect(center=center)
-        self.radius = 1
-        self.max_radius = 50
-        self.animation_speed = 2
-        self.last_update = frame_count
-
-    def update(self, frame_count):
-        if frame_count - self.last_update > self.animation_speed:
-            self.last_update = frame_count
-            self.radius += 1
-            if self.radius >= self.max_radius:
-                self.kill()
-            else:
-                self.image.fill((0, 0, 0, 0))
-                pygame.draw.circle(self.image, (255, 255, 0), (25, 25), self.radius)
-                self.image.set_alpha(255 - (self.radius / self.max_radius) * 255)
-
 class WelcomeAnimation:
     def __init__(self, frame_count):
-        self.font = pygame.font.Font(font_name, 48)
+        self.font = get_font(font_name, 48)
         self.text = "WELCOME TO THE TRAINING GROUND"
         self.text_surface = self.font.render(self.text, True, WHITE)
         self.text_rect = self.text_surface.get_rect()
@@ -434,21 +418,76 @@ class WelcomeAnimation:
         if not self.finished:
             surface.blit(self.text_surface, self.text_rect)
 
-def draw_ui(player):
-    font_name = pygame.font.match_font('arial')
-    global fullscreen_mode
-    if fullscreen_mode:
-        return
-    ui_surface = pygame.Surface((UI_WIDTH, SCREEN_HEIGHT))
-    ui_surface.fill((50, 50, 50))
-    draw_text(ui_surface, f"Score: {player.score}", 18, UI_WIDTH / 2, 10)
-    draw_text(ui_surface, f"Lives: {player.lives}", 18, UI_WIDTH / 2, 40)
-    draw_text(ui_surface, f"Bombs: {player.bombs}", 18, UI_WIDTH / 2, 70)
-    draw_text(ui_surface, f"Power: {player.power}", 18, UI_WIDTH / 2, 100)
-    draw_text(ui_surface, f"Graze: {player.graze}", 18, UI_WIDTH / 2, 130)
-    draw_text(ui_surface, f"Stage: {player.stage}", 18, UI_WIDTH / 2, 160)
-    player.weapon_ui.draw(ui_surface)
-    render_surface.blit(ui_surface, (SCREEN_WIDTH, 0))
+UI_BACKGROUND = (50, 50, 50)
+
+class StatWidget:
+    """One "Label: value" line of the sidebar, tracking a Player attribute."""
+    def __init__(self, label, attr, y):
+        self.label = label
+        self.attr = attr
+        self.rect = pygame.Rect(0, y, UI_WIDTH, 30)
+        self.last_value = None
+
+    def value(self, player):
+        return getattr(player, self.attr)
+
+    def render(self, surface, player, value):
+        draw_text(surface, f"{self.label}: {value}", 18, UI_WIDTH / 2, self.rect.y)
+
+class WeaponWidget:
+    """The WeaponUI ring, which only changes when the active weapon does."""
+    def __init__(self, weapon_ui):
+        self.rect = pygame.Rect(0, weapon_ui.center_y - 35, UI_WIDTH, 80)
+        self.last_value = None
+
+    def value(self, player):
+        return player.weapon_manager.active_weapon_index
+
+    def render(self, surface, player, value):
+        player.weapon_ui.draw(surface)
+
+class Sidebar:
+    """
+    Retained-mode stats panel. The panel surface persists between frames and
+    each widget is re-rendered only when the value it shows has changed, so
+    on most frames the sidebar costs nothing and adds no dirty rects.
+    """
+    def __init__(self, player):
+        self.surface = pygame.Surface((UI_WIDTH, SCREEN_HEIGHT))
+        self.widgets = [
+            StatWidget("Score", "score", 10),
+            StatWidget("Lives", "lives", 40),
+            StatWidget("Bombs", "bombs", 70),
+            StatWidget("Power", "power", 100),
+            StatWidget("Graze", "graze", 130),
+            StatWidget("Stage", "stage", 160),
+            WeaponWidget(player.weapon_ui),
+        ]
+        self.invalidate()
+
+    def invalidate(self):
+        """Forces a full redraw, for when something else has drawn over the sidebar."""
+        self.full_redraw = True
+
+    def draw(self, target, player, pos=(SCREEN_WIDTH, 0)):
+        """Brings the sidebar at `pos` on `target` up to date and returns the target rects that changed."""
+        full_redraw = self.full_redraw
+        if full_redraw:
+            self.surface.fill(UI_BACKGROUND)
+        dirty = []
+        for widget in self.widgets:
+            value = widget.value(player)
+            if full_redraw or value != widget.last_value:
+                widget.last_value = value
+                self.surface.fill(UI_BACKGROUND, widget.rect)
+                widget.render(self.surface, player, value)
+                dirty.append(widget.rect)
+        if full_redraw:
+            self.full_redraw = False
+            dirty = [self.surface.get_rect()]
+        for rect in dirty:
+            target.blit(self.surface, rect.move(pos), rect)
+        return [rect.move(pos) for rect in dirty]
 
 def draw_boss_health_bar(surf, x, y, pct):
     if pct < 0: pct = 0
@@ -460,17 +499,29 @@ def draw_boss_health_bar(surf, x, y, pct):
     pygame.draw.rect(surf, GREEN, fill_rect)
     pygame.draw.rect(surf, WHITE, outline_rect, 2)
 
+# Events that can change what a menu shows
+MENU_EVENTS = (pygame.QUIT, pygame.WINDOWCLOSE, pygame.KEYDOWN, pygame.WINDOWEXPOSED)
+
+def wait_for_input(types=MENU_EVENTS, timeout=0):
+    """
+    Sleeps until an event of one of `types` arrives and returns every event
+    received, so menus redraw only on input and use no CPU while idle. A
+    screen that animates passes `timeout` (ms) to wake up for its next frame.
+    """
+    while True:
+        events = close_events_to_quit([pygame.event.wait(timeout)] + pygame.event.get())
+        if timeout or any(event.type in types for event in events):
+            return events
+
 def show_go_screen(clock):
     render_surface.fill(BLACK)
     draw_text(render_surface, "Aetherium Machina", 64, SCREEN_WIDTH / 2, SCREEN_HEIGHT / 4)
     draw_text(render_surface, "Arrow keys to move, Z to shoot, X to bomb", 22, SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)
     draw_text(render_surface, "Press any key to begin", 18, SCREEN_WIDTH / 2, SCREEN_HEIGHT * 3 / 4)
-    screen.blit(pygame.transform.scale(render_surface, (NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT)), (0, 0))
-    pygame.display.flip()
+    presenter.present()
     waiting = True
     while waiting:
-        clock.tick(60)
-        for event in pygame.event.get():
+        for event in wait_for_input((pygame.QUIT, pygame.WINDOWCLOSE, pygame.KEYUP)):
             if event.type == pygame.QUIT: pygame.quit()
             if event.type == pygame.KEYUP: waiting = False
 
@@ -490,8 +541,7 @@ def fade_to_black(duration):
     for alpha in range(0, 256, 5):
         fade_surface.set_alpha(alpha)
         render_surface.blit(fade_surface, (0, 0))
-        screen.blit(pygame.transform.scale(render_surface, (NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT)), (0, 0))
-        pygame.display.flip()
+        presenter.present()
         pygame.time.delay(duration // (256 // 5))
 
 
@@ -499,15 +549,14 @@ def title_screen():
     pygame.mixer.music.load("media/OST/Title.wav")
     pygame.mixer.music.set_volume(0.25)
     pygame.mixer.music.play(-1)
-    title_image = pygame.image.load("media/images/titleImage.jpg").convert_alpha()
-    title_image = pygame.transform.scale(title_image, (NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT))
-    game_logo = pygame.image.load("media/images/gameLogo.png").convert_alpha()
+    title_image = assets.image("title", size=FRAME_SIZE)
+    game_logo = assets.image("logo")
     game_logo_rect = game_logo.get_rect(center=((SCREEN_WIDTH + UI_WIDTH) / 2, SCREEN_HEIGHT / 4))
     menu_options = ["NEW GAME", "LOAD", "SETTINGS", "EXIT"]
     selected_option = 0
-    cursor_image = pygame.image.load("media/images/cursor.png").convert_alpha()
-    font_name = pygame.font.match_font('timesnewroman') # Using a serif font
-    option_font = pygame.font.Font(font_name, 25)
+    cursor_image = assets.image("cursor")
+    font_name = match_font('timesnewroman') # Using a serif font
+    option_font = get_font(font_name, 25)
     font_height = option_font.get_height()
     cursor_image = pygame.transform.scale(cursor_image, (int(font_height * 1.5), int(font_height * 1.5)))
 
@@ -516,7 +565,6 @@ def title_screen():
         render_surface.blit(game_logo, game_logo_rect)
 
         total_width = 0
-        option_font = pygame.font.Font(font_name, 25)
 
         for option in menu_options:
             total_width += option_font.size(option)[0]
@@ -537,7 +585,7 @@ def title_screen():
         current_x = start_x
         for i, option in enumerate(menu_options):
             color = WHITE if i == selected_option else (150, 150, 150)
-            text_surface = option_font.render(option, True, color)
+            text_surface = text_cache.render(option, font_name, 25, color)
             text_rect = text_surface.get_rect(centery=menu_y)
             text_rect.x = current_x
 
@@ -549,9 +597,8 @@ def title_screen():
             render_surface.blit(text_surface, text_rect)
             current_x += text_rect.width + 50
 
-        screen.blit(pygame.transform.scale(render_surface, (NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT)), (0, 0))
-        pygame.display.flip()
-        for event in pygame.event.get():
+        presenter.present()
+        for event in wait_for_input():
             if event.type == pygame.QUIT: 
                 pygame.mixer.music.stop()
                 return "EXIT"
@@ -567,21 +614,14 @@ def title_screen():
                     return menu_options[selected_option]
 
 
-
-
-fullscreen_mode = False
-
 def options_screen():
-    global screen, NATIVE_WIDTH, NATIVE_HEIGHT, render_surface, fullscreen_mode
-    
-    options = ["Display Mode", "Music Volume", "SFX Volume", "Back"]
+    options = ["Display Mode", "Scaling", "Music Volume", "SFX Volume", "Back"]
     selected_option_index = 0
     
-    display_modes = ["Windowed", "Fullscreen", "Borderless"]
-    selected_mode_index = 0
+    display_modes = DISPLAY_MODES
+    selected_mode_index = display_modes.index(presenter.display_mode)
 
-    options_image = pygame.image.load("media/images/template menu.png").convert()
-    options_image = pygame.transform.scale(options_image, (NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT))
+    options_image = assets.image("options_background", alpha=False, size=FRAME_SIZE)
 
     while True:
         render_surface.blit(options_image, (0, 0))
@@ -593,8 +633,11 @@ def options_screen():
             
             if option == "Display Mode":
                 display_text = f"Display Mode: {display_modes[selected_mode_index]}"
-                font = pygame.font.Font(font_name, size)
-                text_surface = font.render(display_text, True, color)
+                text_surface = text_cache.render(display_text, font_name, size, color)
+                text_rect = text_surface.get_rect(midtop=((SCREEN_WIDTH + UI_WIDTH) / 2, SCREEN_HEIGHT / 2 + i * 60))
+                render_surface.blit(text_surface, text_rect)
+            elif option == "Scaling":
+                text_surface = text_cache.render(f"Scaling: {presenter.scaling.capitalize()}", font_name, size, color)
                 text_rect = text_surface.get_rect(midtop=((SCREEN_WIDTH + UI_WIDTH) / 2, SCREEN_HEIGHT / 2 + i * 60))
                 render_surface.blit(text_surface, text_rect)
             elif option == "Music Volume":
@@ -605,8 +648,7 @@ def options_screen():
                 slider_height = 20
                 
                 # Draw text
-                font = pygame.font.Font(font_name, size)
-                text_surface = font.render(f"Music Volume: {int(settings.music_volume * 100)}%", True, color)
+                text_surface = text_cache.render(f"Music Volume: {int(settings.music_volume * 100)}%", font_name, size, color)
                 text_rect = text_surface.get_rect(midtop=((SCREEN_WIDTH + UI_WIDTH) / 2, slider_y - 30))
                 render_surface.blit(text_surface, text_rect)
 
@@ -621,8 +663,7 @@ def options_screen():
                 slider_height = 20
 
                 # Draw text
-                font = pygame.font.Font(font_name, size)
-                text_surface = font.render(f"SFX Volume: {int(settings.sfx_volume * 100)}%", True, color)
+                text_surface = text_cache.render(f"SFX Volume: {int(settings.sfx_volume * 100)}%", font_name, size, color)
                 text_rect = text_surface.get_rect(midtop=((SCREEN_WIDTH + UI_WIDTH) / 2, slider_y - 30))
                 render_surface.blit(text_surface, text_rect)
 
@@ -630,19 +671,13 @@ def options_screen():
                 pygame.draw.rect(render_surface, (100, 100, 100), (slider_x, slider_y, slider_width, slider_height))
                 pygame.draw.rect(render_surface, WHITE, (slider_x, slider_y, slider_width * settings.sfx_volume, slider_height))
             else: # Back button
-                font = pygame.font.Font(font_name, size)
-                text_surface = font.render(option, True, color)
+                text_surface = text_cache.render(option, font_name, size, color)
                 text_rect = text_surface.get_rect(midtop=((SCREEN_WIDTH + UI_WIDTH) / 2, SCREEN_HEIGHT / 2 + i * 60))
                 render_surface.blit(text_surface, text_rect)
 
+        presenter.present()
 
-        if fullscreen_mode:
-            screen.blit(pygame.transform.scale(render_surface, (NATIVE_WIDTH, NATIVE_HEIGHT)), (0, 0))
-        else:
-            screen.blit(pygame.transform.scale(render_surface, (NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT)), (0, 0))
-        pygame.display.flip()
-
-        for event in pygame.event.get():
+        for event in wait_for_input():
             if event.type == pygame.QUIT:
                 settings.save()
                 return
@@ -656,6 +691,9 @@ def options_screen():
                 elif event.key == pygame.K_LEFT:
                     if options[selected_option_index] == "Display Mode":
                         selected_mode_index = (selected_mode_index - 1) % len(display_modes)
+                    elif options[selected_option_index] == "Scaling":
+                        settings.scaling = SCALING_MODES[(SCALING_MODES.index(presenter.scaling) - 1) % len(SCALING_MODES)]
+                        presenter.set_scaling(settings.scaling)
                     elif options[selected_option_index] == "Music Volume":
                         settings.music_volume = max(0.0, settings.music_volume - 0.05)
                         pygame.mixer.music.set_volume(settings.music_volume)
@@ -667,6 +705,9 @@ def options_screen():
                 elif event.key == pygame.K_RIGHT:
                     if options[selected_option_index] == "Display Mode":
                         selected_mode_index = (selected_mode_index + 1) % len(display_modes)
+                    elif options[selected_option_index] == "Scaling":
+                        settings.scaling = SCALING_MODES[(SCALING_MODES.index(presenter.scaling) + 1) % len(SCALING_MODES)]
+                        presenter.set_scaling(settings.scaling)
                     elif options[selected_option_index] == "Music Volume":
                         settings.music_volume = min(1.0, settings.music_volume + 0.05)
                         pygame.mixer.music.set_volume(settings.music_volume)
@@ -677,27 +718,9 @@ def options_screen():
 
                 elif event.key == pygame.K_RETURN:
                     if options[selected_option_index] == "Display Mode":
-                        selected_mode = display_modes[selected_mode_index]
-                        screen_info = pygame.display.Info()
-                        if selected_mode == "Windowed":
-                            fullscreen_mode = False
-                            NATIVE_WIDTH, NATIVE_HEIGHT = 800, 600
-                            x = (screen_info.current_w - (NATIVE_WIDTH + UI_WIDTH)) // 2
-                            y = (screen_info.current_h - NATIVE_HEIGHT) // 2
-                            os.environ['SDL_VIDEO_WINDOW_POS'] = f"{x},{y}"
-                            screen = pygame.display.set_mode((NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT))
-                            render_surface = pygame.Surface((SCREEN_WIDTH + UI_WIDTH, SCREEN_HEIGHT))
-                        elif selected_mode == "Fullscreen":
-                            fullscreen_mode = True
-                            NATIVE_WIDTH, NATIVE_HEIGHT = screen_info.current_w, screen_info.current_h
-                            screen = pygame.display.set_mode((NATIVE_WIDTH, NATIVE_HEIGHT), pygame.FULLSCREEN)
-                            render_surface = pygame.Surface((NATIVE_WIDTH, NATIVE_HEIGHT))
-                        elif selected_mode == "Borderless":
-                            fullscreen_mode = True
-                            NATIVE_WIDTH, NATIVE_HEIGHT = screen_info.current_w, screen_info.current_h
-                            os.environ['SDL_VIDEO_WINDOW_POS'] = "0,0"
-                            screen = pygame.display.set_mode((NATIVE_WIDTH, NATIVE_HEIGHT), pygame.NOFRAME)
-                            render_surface = pygame.Surface((NATIVE_WIDTH, NATIVE_HEIGHT))
+                        # The frame keeps its size in every mode; only the window changes and the renderer scales
+                        settings.display_mode = display_modes[selected_mode_index]
+                        presenter.set_display_mode(settings.display_mode)
                     elif options[selected_option_index] == "Back":
                         settings.save()
                         return
@@ -708,38 +731,40 @@ def options_screen():
 all_sprites = pygame.sprite.Group()
 player_sprite = pygame.sprite.GroupSingle()
 bullets = pygame.sprite.Group()
+homing_missiles = pygame.sprite.Group()
 enemies = pygame.sprite.Group()
-enemy_bullets = pygame.sprite.Group()
-powerups = pygame.sprite.Group()
+enemy_bullets = BulletField()
+items = ItemField()
 beams = pygame.sprite.Group()
+particles = ParticleSystem()
+bullet_pool = None # Built by GameSession; its bullets need the decoded images
 
-def pause_menu(screen, render_surface):
+def pause_menu():
     menu_options = ["Continue", "Quit to Main Menu"]
     selected_option = 0
-    font_name = pygame.font.match_font('arial')
-    option_font = pygame.font.Font(font_name, 30)
-    paused_font = pygame.font.Font(font_name, 64)
 
-    overlay = pygame.Surface((NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT), pygame.SRCALPHA)
+    overlay = pygame.Surface(FRAME_SIZE, pygame.SRCALPHA)
     overlay.fill((0, 0, 0, 180))
+    # Dim the paused frame once, so redraws don't keep darkening it
+    background = render_surface.copy()
+    background.blit(overlay, (0, 0))
 
     while True:
-        render_surface.blit(overlay, (0, 0))
+        render_surface.blit(background, (0, 0))
 
-        paused_text = paused_font.render("Paused", True, WHITE)
+        paused_text = text_cache.render("Paused", font_name, 64, WHITE)
         paused_rect = paused_text.get_rect(center=((SCREEN_WIDTH + UI_WIDTH) / 2, SCREEN_HEIGHT / 4))
         render_surface.blit(paused_text, paused_rect)
 
         for i, option in enumerate(menu_options):
             color = WHITE if i == selected_option else (150, 150, 150)
-            text_surface = option_font.render(option, True, color)
+            text_surface = text_cache.render(option, font_name, 30, color)
             text_rect = text_surface.get_rect(center=((SCREEN_WIDTH + UI_WIDTH) / 2, SCREEN_HEIGHT / 2 + i * 50))
             render_surface.blit(text_surface, text_rect)
 
-        screen.blit(pygame.transform.scale(render_surface, (NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT)), (0, 0))
-        pygame.display.flip()
+        presenter.present()
 
-        for event in pygame.event.get():
+        for event in wait_for_input():
             if event.type == pygame.QUIT:
                 return "QUIT"
             if event.type == pygame.KEYDOWN:
@@ -757,90 +782,149 @@ def pause_menu(screen, render_surface):
                 elif event.key == pygame.K_ESCAPE:
                     return "CONTINUE"
 
-def game_loop(new_game=True):
-    global game_over, running, all_sprites, player_sprite, bullets, enemies, enemy_bullets, powerups, bosses
-
-    frame_count = 0
+class KeyState:
+    """Stand-in for pygame.key.get_pressed() built from a set of held keys, for scripted input."""
+    def __init__(self, held=()):
+        self.held = frozenset(held)
+
+    def __getitem__(self, key):
+        return key in self.held
+
+# Blank sprites by class name for GameSession.restore() to fill in; built through the current session's groups
+SNAPSHOT_SPRITES = {
+    "Bullet": lambda session: bullet_pool.acquire(0, 0, 0, 0),
+    "HomingMissile": lambda session: HomingMissile(0, 0, 0, 0, session.enemy_index),
+    "Beam": lambda session: Beam(0, 0, 0),
+    "BossTypeA": lambda session: BossTypeA(session.player, all_sprites, enemy_bullets),
+    **{cls.__name__: (lambda session, cls=cls: cls(0, 0, session.player, all_sprites, enemy_bullets, SCREEN_HEIGHT))
+       for cls in (EnemyTypeA, EnemyTypeB, EnemyTypeC, Miniboss)},
+}
 
-    enemies = pygame.sprite.Group()
-    player = Player(enemies)
-    if not new_game:
-        saved_data = load_game()
-        if saved_data:
+def idle_input(frame_count):
+    return KeyState(), ()
+
+class GameSession:
+    """
+    One play-through: the player, sprite groups and stage, advanced by
+    step() exactly one fixed 1/60 s frame at a time. Nothing in here reads
+    the clock, the keyboard or the display, so the same simulation runs in
+    the windowed game_loop or headless at unlimited speed. Headless sessions
+    skip music and never touch the save file. Given the same seed, starting
+    state and inputs, a session replays frame for frame.
+    """
+    def __init__(self, new_game=True, headless=False, seed=None, saved_data=None):
+        global all_sprites, player_sprite, bullets, homing_missiles, enemies, enemy_bullets, items, bosses, particles, bullet_pool
+
+        self.frame_count = 0
+        self.headless = headless
+        self.new_game = new_game
+        streams.reseed(seed)
+        self.seed = streams.seed
+
+        enemies = pygame.sprite.Group()
+        # Rebuilt from enemies at the end of each update_entities, then used by homing missiles and collisions
+        self.enemy_index = SpatialHash()
+        self.player = player = Player(self.enemy_index)
+        self.start_state = None
+        if not new_game:
+            if saved_data is None and not headless:
+                saved_data = load_game()
+            # A missing save is recorded as {} so a replay never picks up whatever save exists at playback
+            self.start_state = saved_data = saved_data or {}
             for key, value in saved_data.items(): setattr(player, key, value)
 
-    all_sprites = pygame.sprite.Group(player)
-    player_sprite = pygame.sprite.GroupSingle(player)
-    bullets, enemy_bullets, powerups, bosses = (pygame.sprite.Group() for _ in range(4))
-    beams.empty()
-
-    stage_manager = StageManager(player, all_sprites, enemies, enemy_bullets, bosses)
-    
-    welcome_animation = None
-    if new_game and player.stage == 1:
-        welcome_animation = WelcomeAnimation(frame_count)
-
-    stage_music_playing = False
-
-    game_over = False
-    running = True
-    clock = pygame.time.Clock()
-
-    frame_count = 0
-
-    while running:
-        if game_over:
-            pygame.mixer.Channel(0).stop()
-            show_go_screen(clock)
-            return
-
-        clock.tick(60)
-        frame_count += 1
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: 
-                pygame.mixer.Channel(0).stop()
-                running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_x: player.use_bomb()
-                if event.key == pygame.K_q: player.weapon_manager.switch_weapon()
-                if event.key == pygame.K_ESCAPE:
-                    pygame.mixer.Channel(0).stop()
-                    action = pause_menu(screen, render_surface)
-                    if action == "QUIT":
-                        save_game(player)
-                        return
-
-
+        all_sprites = pygame.sprite.Group(player)
+        player_sprite = pygame.sprite.GroupSingle(player)
+        bullets, homing_missiles, bosses = (pygame.sprite.Group() for _ in range(3))
+        enemy_bullets = BulletField()
+        items = ItemField()
+        particles = ParticleSystem()
+        bullet_pool = BulletPool()
+        beams.empty()
+
+        self.stage_manager = StageManager(player, all_sprites, enemies, enemy_bullets, bosses)
+        self.boss_index = SpatialHash(cell_size=128)
+
+        self.welcome_animation = None
+        if new_game and player.stage == 1:
+            self.welcome_animation = WelcomeAnimation(self.frame_count)
+
+        # Back to front; everything in all_sprites belongs to exactly one of these layers
+        self.render_passes = passes = RenderPasses()
+        passes.add("background", self.clear)
+        passes.add("enemies", enemies, bosses)
+        passes.add("player_bullets", bullets, beams)
+        passes.add("player", player_sprite)
+        passes.add("enemy_bullets", enemy_bullets.draw)
+        passes.add("items", items.draw)
+        passes.add("effects", particles.draw, self.draw_welcome_animation)
+
+        self.stage_music_playing = False
+        self.game_over = False
+        self.timer = NULL_TIMER
+
+    def step(self, keys, pressed=()):
+        """Advances one frame. `keys` is the held-key state, `pressed` the keys that went down since the last step."""
+        self.frame_count += 1
+        with self.timer.phase("update"):
+            self.update_entities(keys, pressed)
+        with self.timer.phase("collision"):
+            self.resolve_collisions()
+        with self.timer.phase("graze"):
+            self.player.graze += enemy_bullets.graze(self.player.rect.center, 50)
+
+    def update_entities(self, keys, pressed):
+        frame_count = self.frame_count
+        player = self.player
+
+        for key in pressed:
+            if key == pygame.K_x: player.use_bomb()
+            if key == pygame.K_q: player.weapon_manager.switch_weapon()
+
+        player.keys = keys
+        enemy_bullets.update(frame_count)
         all_sprites.update(frame_count)
+        items.update(frame_count)
+        particles.update()
 
-        if welcome_animation:
-            welcome_animation.update(frame_count)
-            if welcome_animation.finished:
-                if not stage_music_playing:
+        if self.welcome_animation:
+            self.welcome_animation.update(frame_count)
+            if self.welcome_animation.finished:
+                if not self.stage_music_playing and not self.headless:
                     pygame.mixer.music.load("media/OST/stage1-normal.wav")
                     pygame.mixer.music.set_volume(0.25)
                     pygame.mixer.music.play(-1)
-                    stage_music_playing = True
+                    self.stage_music_playing = True
 
-                welcome_animation = None
+                self.welcome_animation = None
         else:
-            stage_manager.update(frame_count)
+            self.stage_manager.update(frame_count)
+
+        # The one rebuild per frame, once everything has moved and spawned: missiles pick targets from it and collisions reuse it
+        self.enemy_index.rebuild(enemies)
+        for missile in homing_missiles:
+            missile.acquire_target()
+
+    def resolve_collisions(self):
+        frame_count = self.frame_count
+        player = self.player
 
-        beam_hits = pygame.sprite.groupcollide(enemies, beams, False, False)
+        beam_hits = self.enemy_index.collide_columns(beams)
         for enemy, hit_beams in beam_hits.items():
             for beam in hit_beams:
                 enemy.debuffs["damage_vulnerability"] = {"start_time": frame_count, "duration": 600}
                 enemy.health -= 1
             if enemy.health <= 0:
                 player.score += 100
-                powerup = PowerUp(enemy.rect.center)
-                all_sprites.add(powerup)
-                powerups.add(powerup)
+                items.spawn(*enemy.rect.center, "power")
+                particles.emit(*enemy.rect.center, "pop")
+                particles.burst(*enemy.rect.center, "spark", 6, 3)
                 enemy.kill()
 
-        hits = pygame.sprite.groupcollide(enemies, bullets, False, True)
+        hits = self.enemy_index.collide_group(bullets, dokill=True)
         for enemy, hit_bullets in hits.items():
             for bullet in hit_bullets:
+                particles.burst(*bullet.rect.midtop, "spark", 3, 2)
                 if isinstance(bullet, HomingMissile):
                     damage = 5
                     if "damage_vulnerability" in enemy.debuffs:
@@ -854,13 +938,14 @@ def game_loop(new_game=True):
 
             if enemy.health <= 0:
                 player.score += 100
-                powerup = PowerUp(enemy.rect.center)
-                all_sprites.add(powerup)
-                powerups.add(powerup)
+                items.spawn(*enemy.rect.center, "power")
+                particles.emit(*enemy.rect.center, "pop")
+                particles.burst(*enemy.rect.center, "spark", 6, 3)
                 enemy.kill()
 
         if bosses:
-            boss_beam_hits = pygame.sprite.groupcollide(bosses, beams, False, False)
+            self.boss_index.rebuild(bosses)
+            boss_beam_hits = self.boss_index.collide_columns(beams)
             for boss, hit_beams in boss_beam_hits.items():
                 for beam in hit_beams:
                     boss.debuffs["damage_vulnerability"] = {"start_time": frame_count, "duration": 600}
@@ -869,12 +954,16 @@ def game_loop(new_game=True):
                         damage *= 0.1
                     boss.health -= damage
                 if boss.health <= 0:
+                    particles.emit(*boss.rect.center, "boss_explosion")
+                    particles.burst(*boss.rect.center, "spark", 40, 5)
                     boss.kill()
                     player.score += 10000
-                    save_game(player)
+                    self.save()
 
-            hits = pygame.sprite.groupcollide(bosses, bullets, False, True)
+            hits = self.boss_index.collide_group(bullets, dokill=True)
             for boss, hit_bullets in hits.items():
+                for bullet in hit_bullets:
+                    particles.burst(*bullet.rect.midtop, "spark", 3, 2)
                 damage = 10 * len(hit_bullets)
                 if "damage_vulnerability" in boss.debuffs:
                     damage *= 1.5
@@ -884,64 +973,295 @@ def game_loop(new_game=True):
 
                 boss.health -= damage
                 if boss.health <= 0:
+                    particles.emit(*boss.rect.center, "boss_explosion")
+                    particles.burst(*boss.rect.center, "spark", 40, 5)
                     boss.kill()
                     player.score += 10000
-                    save_game(player)
+                    self.save()
 
-        if pygame.sprite.spritecollide(player, enemy_bullets, True, pygame.sprite.collide_mask) and not player.invincible:
+        if enemy_bullets.collide_hitbox(player.rect.center, player.hitbox) and not player.invincible:
             player.die(frame_count)
 
         if player.lives <= 0:
-            game_over = True
+            self.game_over = True
 
         if player.rect.y < 150:
-            for powerup in powerups:
-                powerup.rect.x += (player.rect.centerx - powerup.rect.centerx) / 10
-                powerup.rect.y += (player.rect.centery - powerup.rect.centery) / 10
-        
-        for hit in pygame.sprite.spritecollide(player, powerups, True):
-            player.power += 1
-
-        for bullet in enemy_bullets:
-            if not bullet.grazed and pygame.math.Vector2(player.rect.center).distance_to(bullet.rect.center) < 50:
-                player.graze += 1
-                bullet.grazed = True
-
-        game_surface.fill(BLACK)
-        all_sprites.draw(game_surface)
-        if welcome_animation:
-            welcome_animation.draw(game_surface)
-        player.draw_hitbox(game_surface)
+            items.attract(player.rect.center)
+
+        for stat, value in items.collect(player.rect).items():
+            setattr(player, stat, getattr(player, stat) + value)
+
+    def save(self):
+        if not self.headless:
+            save_game(self.player)
+
+    def state_hash(self):
+        """CRC32 of the simulation state that matters for replays: the player, every enemy and boss, and the bullet field."""
+        player = self.player
+        values = [self.frame_count, player.position.x, player.position.y, player.lives, player.bombs,
+                  player.power, player.score, player.graze, player.invincible]
+        for group in (enemies, bosses):
+            for sprite in group:
+                values += (sprite.rect.x, sprite.rect.y, sprite.health)
+        state = np.array(values, dtype=np.float64).tobytes()
+        n = enemy_bullets.count
+        for arr in (enemy_bullets.x, enemy_bullets.y, enemy_bullets.vx, enemy_bullets.vy, enemy_bullets.type, enemy_bullets.flags):
+            state += arr[:n].tobytes()
+        return zlib.crc32(state)
+
+    def state_summary(self):
+        """(score, lives, enemies, bullets), stored with replay keyframes."""
+        return self.player.score, self.player.lives, len(enemies), len(enemy_bullets)
+
+    def sprite_groups(self):
+        return {"all_sprites": all_sprites, "player_sprite": player_sprite, "bullets": bullets, "homing_missiles": homing_missiles,
+                "enemies": enemies, "bosses": bosses, "beams": beams}
+
+    def snapshot(self):
+        """
+        Everything step() depends on as JSON-safe data, taken between steps,
+        for replay keyframes. restore() brings it back in a session started
+        with the same seed and start state.
+        """
+        groups = self.sprite_groups()
+        sprites = []
+        sprite_ids = {}
+        for group in groups.values():
+            for sprite in group:
+                if id(sprite) not in sprite_ids:
+                    sprite_ids[id(sprite)] = len(sprites)
+                    sprites.append(sprite)
+        player = self.player
+        manager = player.weapon_manager
+        stage = self.stage_manager.current_stage
+        scheduler = stage.scheduler
+        return {
+            "frame": self.frame_count,
+            "game_over": self.game_over,
+            "stage_music_playing": self.stage_music_playing,
+            "player": encode_attrs(player, sprite_ids),
+            "weapon_manager": encode_attrs(manager),
+            "weapons": [encode_attrs(weapon) for weapon in manager.weapons["active"] + manager.weapons["passive"]],
+            # The player is kept, not rebuilt, so it has no attributes here
+            "sprites": [[type(sprite).__name__, None if sprite is player else encode_attrs(sprite, sprite_ids)] for sprite in sprites],
+            "groups": {name: [sprite_ids[id(sprite)] for sprite in group] for name, group in groups.items()},
+            "enemy_bullets": enemy_bullets.snapshot(),
+            "items": items.snapshot(),
+            "particles": particles.snapshot(),
+            "stage_index": self.stage_manager.current_stage_index,
+            "stage": encode_attrs(stage, sprite_ids),
+            "scheduler": {"frame": scheduler.frame, "events": scheduler.events, "total_events": scheduler.total_events, "peak_events": scheduler.peak_events},
+            "welcome_animation": encode_attrs(self.welcome_animation) if self.welcome_animation else None,
+            "streams": streams.getstate(),
+        }
+
+    def restore(self, state):
+        """Puts the simulation back to a snapshot(); images, sounds and group wiring come from this session."""
+        player = self.player
+        for sprite in all_sprites.sprites():
+            if sprite is not player:
+                sprite.kill()
+        for group in self.sprite_groups().values():
+            group.empty()
+
+        self.frame_count = state["frame"]
+        self.game_over = state["game_over"]
+        self.stage_music_playing = state["stage_music_playing"]
+        decode_attrs(player, state["player"])
+        player.image = player.rotation_frames[player.angle // ROTATION_STEP]
+        manager = player.weapon_manager
+        decode_attrs(manager, state["weapon_manager"])
+        for weapon, attrs in zip(manager.weapons["active"] + manager.weapons["passive"], state["weapons"]):
+            decode_attrs(weapon, attrs)
+
+        sprites = [player if attrs is None else SNAPSHOT_SPRITES[kind](self) for kind, attrs in state["sprites"]]
+        for sprite, (_, attrs) in zip(sprites, state["sprites"]):
+            if attrs is not None:
+                decode_attrs(sprite, attrs, sprites)
+            if isinstance(sprite, Bullet):
+                sprite.image, sprite.mask = get_bullet_assets(sprite.bullet_type)
+        groups = self.sprite_groups()
+        for name, indices in state["groups"].items():
+            groups[name].add(*(sprites[i] for i in indices))
+        enemy_bullets.restore(state["enemy_bullets"])
+        items.restore(state["items"])
+        particles.restore(state["particles"])
+
+        stage_manager = self.stage_manager
+        stage_manager.current_stage_index = index = state["stage_index"]
+        attrs = state["stage"]
+        stage = stage_manager.stages[index](player, all_sprites, enemies, enemy_bullets, bosses, attrs["start_frame"])
+        stage.fast_forward(attrs["first_update"], state["scheduler"]["frame"])
+        decode_attrs(stage, attrs, sprites)
+        for name, value in state["scheduler"].items():
+            setattr(stage.scheduler, name, value)
+        stage_manager.current_stage = stage
+
+        self.welcome_animation = None
+        if state["welcome_animation"] is not None:
+            self.welcome_animation = WelcomeAnimation(0)
+            decode_attrs(self.welcome_animation, state["welcome_animation"])
+        # Last, since rebuilding the sprites and the stage draws from the streams
+        streams.setstate(state["streams"])
+        self.enemy_index.rebuild(enemies)
+
+    def clear(self, surface):
+        surface.fill(BLACK)
+        return 0
+
+    def draw_welcome_animation(self, surface):
+        if self.welcome_animation:
+            self.welcome_animation.draw(surface)
+            return 1
+        return 0
+
+    def draw(self, surface):
+        self.render_passes.draw(surface)
+        self.player.draw_hitbox(surface)
         for boss in bosses:
-            draw_boss_health_bar(game_surface, 5, 5, (boss.health / boss.max_health) * 100)
+            draw_boss_health_bar(surface, 5, 5, (boss.health / boss.max_health) * 100)
 
-        if fullscreen_mode:
-            scaled_game_surface = pygame.transform.scale(game_surface, (NATIVE_WIDTH, NATIVE_HEIGHT))
-            screen.blit(scaled_game_surface, (0, 0))
-        else:
-            render_surface.fill(BLACK)
+def entity_counts():
+    return {"enemies": len(enemies), "bosses": len(bosses), "beams": len(beams),
+            "shots": len(bullets), "bullets": len(enemy_bullets), "items": len(items), "particles": len(particles)}
+
+def game_loop(new_game=True):
+    session = GameSession(new_game)
+    if not settings.record_replays:
+        play_session(session)
+        return
+    # The replay is written however the session ends
+    recorder = ReplayRecorder(session)
+    try:
+        play_session(session, recorder)
+    finally:
+        if recorder.replay.frames:
+            recorder.save()
+
+def play_session(session, recorder=None):
+    player = session.player
+    clock = pygame.time.Clock()
+    lag = 0
+    pressed = []
+
+    sidebar = Sidebar(player)
+
+    # F3 toggles the overlay, F4 dumps a Chrome trace, F5 starts/stops cProfile
+    profiler = FrameProfiler()
+    profiler_overlay = ProfilerOverlay(profiler, font_name)
+    session.timer = profiler
+
+    while True:
+        # Real time is fed into a fixed-step accumulator, so the simulation
+        # always advances in whole 1/60 s frames whatever the render rate
+        lag += clock.tick(FPS)
+        profiler.begin_frame()
+        for event in close_events_to_quit(pygame.event.get()):
+            if event.type == pygame.QUIT: 
+                pygame.mixer.Channel(0).stop()
+                return
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE:
+                    pygame.mixer.Channel(0).stop()
+                    action = pause_menu()
+                    if action == "QUIT":
+                        save_game(player)
+                        return
+                    clock.tick()
+                    lag = 0
+                    sidebar.invalidate()
+                elif event.key == pygame.K_F3:
+                    profiler_overlay.toggle()
+                    sidebar.invalidate()
+                elif event.key == pygame.K_F4:
+                    profiler_overlay.dump_chrome_trace()
+                elif event.key == pygame.K_F5:
+                    profiler_overlay.toggle_cprofile()
+                else:
+                    pressed.append(event.key)
+
+        keys = pygame.key.get_pressed()
+        steps = 0
+        while lag >= FRAME_TIME and steps < MAX_STEPS_PER_RENDER:
+            # Input goes through the replay encoding so the simulation sees exactly what a replay will
+            code = encode_input(keys, pressed)
+            held, step_pressed = decode_input(code)
+            session.step(KeyState(held), step_pressed)
+            if recorder:
+                recorder.record(code)
+            pressed = []
+            lag -= FRAME_TIME
+            steps += 1
+            if session.game_over:
+                pygame.mixer.Channel(0).stop()
+                show_go_screen(clock)
+                return
+        if steps == MAX_STEPS_PER_RENDER:
+            lag = 0 # Too far behind to catch up; drop the backlog instead of spiralling
+
+        with profiler.phase("draw"):
+            session.draw(game_surface)
+
+        with profiler.phase("ui"):
+            # The play field changes every frame; the sidebar only where a stat did
             render_surface.blit(game_surface, (0, 0))
-            draw_ui(player)
-            screen.blit(render_surface, (0, 0))
+            dirty = [game_surface.get_rect()] + sidebar.draw(render_surface, player)
+            if profiler_overlay.visible:
+                layer_counts = {name: count for name, count in session.render_passes.counts.items() if name != "background"}
+                counts = {**entity_counts(), "stage events": session.stage_manager.current_stage.scheduler.events}
+                dirty.append(profiler_overlay.draw(render_surface, (SCREEN_WIDTH, SCREEN_HEIGHT), counts, layer_counts))
+
+        with profiler.phase("present"):
+            presenter.present(dirty)
+        profiler.end_frame()
+
+def run_headless(frames, input_source=idle_input, new_game=True, render=False, session=None, seed=None):
+    """
+    Steps a session for `frames` frames as fast as possible, with no clock and
+    no display flip. `input_source(frame_count)` returns (held keys, pressed
+    keys) for each frame. Stops early on game over.
+    """
+    if session is None:
+        session = GameSession(new_game, headless=True, seed=seed)
+    for _ in range(frames):
+        keys, pressed = input_source(session.frame_count + 1)
+        session.step(keys, pressed)
+        if render:
+            session.draw(game_surface)
+        if session.game_over:
+            break
+    return session
 
-        pygame.display.flip()
+def draw_load_progress(surf, progress):
+    bar = pygame.Rect(0, SCREEN_HEIGHT - 4, (SCREEN_WIDTH + UI_WIDTH) * progress, 4)
+    pygame.draw.rect(surf, WHITE, bar)
 
 def splash_screen():
-    splash_image = pygame.image.load("media/images/splashScreen.png").convert_alpha()
-    splash_image = pygame.transform.scale(splash_image, (NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT))
-    title_image = pygame.image.load("media/images/titleImage.jpg").convert_alpha()
-    title_image = pygame.transform.scale(title_image, (NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT))
+    # Everything else decodes on the asset thread while the splash plays
+    assets.start()
+    # Fades change a surface's alpha, so they work on copies of the shared cached images
+    splash_image = assets.image("splash", size=FRAME_SIZE).copy()
 
     # Fade in splash
     for alpha in range(0, 256, 5):
         splash_image.set_alpha(alpha)
         render_surface.fill(BLACK)
         render_surface.blit(splash_image, (0, 0))
-        screen.blit(pygame.transform.scale(render_surface, (NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT)), (0, 0))
-        pygame.display.flip()
+        draw_load_progress(render_surface, assets.progress())
+        presenter.present()
+        pygame.time.delay(30)
+
+    # Hold the splash for two seconds, or until loading finishes if that takes longer
+    hold_until = pygame.time.get_ticks() + 2000
+    while pygame.time.get_ticks() < hold_until or not assets.finished():
+        pygame.event.pump()
+        render_surface.fill(BLACK)
+        render_surface.blit(splash_image, (0, 0))
+        draw_load_progress(render_surface, assets.progress())
+        presenter.present()
         pygame.time.delay(30)
 
-    pygame.time.delay(2000)
+    title_image = assets.image("title", size=FRAME_SIZE).copy()
 
     # Fade out splash and fade in title
     for alpha in range(0, 256, 5):
@@ -950,13 +1270,11 @@ def splash_screen():
         render_surface.fill(BLACK)
         render_surface.blit(splash_image, (0, 0))
         render_surface.blit(title_image, (0, 0))
-        screen.blit(pygame.transform.scale(render_surface, (NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT)), (0, 0))
-        pygame.display.flip()
+        presenter.present()
         pygame.time.delay(30)
 
 def chapter_screen():
-    chapter_image = pygame.image.load("media/images/Chapter1.jpg").convert()
-    chapter_image = pygame.transform.scale(chapter_image, (NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT))
+    chapter_image = assets.image("chapter1", alpha=False, size=FRAME_SIZE).copy()
     next_button_rect = pygame.Rect((SCREEN_WIDTH + UI_WIDTH) / 2 - 50, SCREEN_HEIGHT - 100, 100, 50)
     
     # Fade in
@@ -965,25 +1283,37 @@ def chapter_screen():
         render_surface.blit(chapter_image, (0, 0))
         pygame.draw.rect(render_surface, BLACK, next_button_rect)
         draw_text(render_surface, "NEXT", 30, next_button_rect.centerx, next_button_rect.centery - 15)
-        screen.blit(pygame.transform.scale(render_surface, (NATIVE_WIDTH + UI_WIDTH, NATIVE_HEIGHT)), (0, 0))
-        pygame.display.flip()
+        presenter.present()
         pygame.time.delay(10)
 
     waiting = True
     while waiting:
-        for event in pygame.event.get():
+        for event in wait_for_input((pygame.QUIT, pygame.WINDOWCLOSE, pygame.MOUSEBUTTONDOWN)):
             if event.type == pygame.QUIT:
                 pygame.quit()
                 return "EXIT"
             if event.type == pygame.MOUSEBUTTONDOWN:
-                if next_button_rect.collidepoint(event.pos):
+                if next_button_rect.collidepoint(presenter.to_logical(event.pos)):
                     waiting = False
     
     # Fade out
     fade_to_black(1000)
     return "START"
 
-if __name__ == "__main__":
+if __name__ == "__main__" and "--headless" in sys.argv:
+    import argparse
+    parser = argparse.ArgumentParser(description="Run the simulation without a window at unlimited speed.")
+    parser.add_argument("--headless", action="store_true")
+    parser.add_argument("--frames", type=int, default=3600)
+    parser.add_argument("--render", action="store_true", help="also draw each frame off-screen")
+    parser.add_argument("--seed", type=parse_seed)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    session = run_headless(args.frames, render=args.render, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    print(f"{session.frame_count} frames in {elapsed:.2f}s ({session.frame_count / elapsed:.0f} fps)")
+    pygame.quit()
+elif __name__ == "__main__":
     splash_screen()
     while True:
         choice = title_screen()
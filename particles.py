@@ -0,0 +1,141 @@
+import numpy as np
+import pygame
+from array_field import ArrayField
+from render import blit_batch
+
+# Each kind is a circle animation baked once into frames shared by every
+# emitter: frame i draws radii[i], fading out evenly over the frames, and is
+# held for `hold` game frames. Velocity is multiplied by `drag` every frame.
+PARTICLE_KINDS = {
+    # The old Explosion sprite: a yellow disc growing by 1px every 3 frames inside a 50px square
+    "explosion": {"size": 50, "color": (255, 255, 0), "radii": range(1, 50), "hold": 3, "drag": 1.0},
+    "boss_explosion": {"size": 120, "color": (255, 200, 60), "radii": range(2, 60, 2), "hold": 3, "drag": 1.0},
+    "pop": {"size": 24, "color": (255, 160, 40), "radii": range(2, 12), "hold": 2, "drag": 1.0},
+    "spark": {"size": 6, "color": (255, 240, 180), "radii": (3, 3, 2, 2, 1, 1), "hold": 2, "drag": 0.9},
+}
+_particle_frames = {}
+
+def get_particle_frames(kind):
+    """Returns the shared animation frames for a particle kind, baking them on first use."""
+    frames = _particle_frames.get(kind)
+    if frames is None:
+        spec = PARTICLE_KINDS[kind]
+        size = spec["size"]
+        radii = list(spec["radii"])
+        frames = []
+        for i, radius in enumerate(radii):
+            image = pygame.Surface((size, size), pygame.SRCALPHA)
+            alpha = int(255 - (i + 1) / (len(radii) + 1) * 255)
+            pygame.draw.circle(image, (*spec["color"], alpha), (size // 2, size // 2), radius)
+            if pygame.display.get_surface() is not None:
+                image = image.convert_alpha()
+            frames.append(image)
+        _particle_frames[kind] = frames
+    return frames
+
+class ParticleSystem(ArrayField):
+    """
+    Fixed-capacity pool of short-lived effect particles. A particle is only
+    a position, a velocity, an age and a kind; its image is picked from the
+    kind's baked frames by age, and every live particle is drawn in one
+    batched blit. Emits past capacity are dropped (and counted) rather than
+    growing the pool, so a mass kill costs at most `capacity` particles.
+    """
+    COLUMNS = (("x", float), ("y", float), ("vx", float), ("vy", float), ("age", np.int32), ("kind", np.int16))
+
+    def __init__(self, capacity=2048):
+        self.count = 0
+        self.dropped = 0
+        self._allocate(capacity)
+
+        # Per-kind columns indexed by kind id; frames of every kind share one flat list
+        self.kind_ids = {}
+        self.frames = []
+        self.first_frame = np.zeros(0, dtype=np.int32)
+        self.hold = np.zeros(0, dtype=np.int32)
+        self.lifetime = np.zeros(0, dtype=np.int32)
+        self.drag = np.zeros(0)
+        self.half_size = np.zeros(0)
+        # Cosmetic only, so it stays off the seeded gameplay streams and out of replays
+        self.rng = np.random.default_rng()
+
+    def kind_id(self, kind):
+        kind_id = self.kind_ids.get(kind)
+        if kind_id is None:
+            spec = PARTICLE_KINDS[kind]
+            frames = get_particle_frames(kind)
+            kind_id = self.kind_ids[kind] = len(self.kind_ids)
+            self.first_frame = np.append(self.first_frame, len(self.frames))
+            self.frames.extend(frames)
+            self.hold = np.append(self.hold, spec["hold"])
+            self.lifetime = np.append(self.lifetime, len(frames) * spec["hold"])
+            self.drag = np.append(self.drag, spec["drag"])
+            self.half_size = np.append(self.half_size, spec["size"] / 2)
+        return kind_id
+
+    def emit(self, x, y, kind, vx=0.0, vy=0.0):
+        """Starts particles of `kind`; each argument may be a scalar or a sequence, as with BulletField.spawn_many."""
+        kind_id = self.kind_id(kind)
+        x, y, vx, vy = np.broadcast_arrays(x, y, vx, vy)
+        room = self.capacity - self.count
+        if x.size > room:
+            self.dropped += x.size - room
+            x, y, vx, vy = x.flat[:room], y.flat[:room], vx.flat[:room], vy.flat[:room]
+        i, j = self.count, self.count + x.size
+        self.x[i:j] = x.flat
+        self.y[i:j] = y.flat
+        self.vx[i:j] = vx.flat
+        self.vy[i:j] = vy.flat
+        self.age[i:j] = 0
+        self.kind[i:j] = kind_id
+        self.count = j
+
+    def burst(self, x, y, kind, count, speed):
+        """`count` particles flying out from (x, y) in random directions at up to `speed` px per frame."""
+        angle = self.rng.uniform(0, 2 * np.pi, count)
+        velocity = self.rng.uniform(0.25 * speed, speed, count)
+        self.emit(x, y, kind, np.cos(angle) * velocity, np.sin(angle) * velocity)
+
+    def update(self):
+        n = self.count
+        if n == 0:
+            return
+        kinds = self.kind[:n]
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        drag = self.drag[kinds]
+        self.vx[:n] *= drag
+        self.vy[:n] *= drag
+        age = self.age[:n]
+        age += 1
+        keep = age < self.lifetime[kinds]
+        if not keep.all():
+            self._compact(keep)
+
+    def draw(self, surface):
+        """Draws each particle with the frame its age has reached."""
+        n = self.count
+        if n == 0:
+            return 0
+        kinds = self.kind[:n]
+        frame = self.first_frame[kinds] + self.age[:n] // self.hold[kinds]
+        half = self.half_size[kinds]
+        left = np.floor(self.x[:n] - half).astype(int)
+        top = np.floor(self.y[:n] - half).astype(int)
+        frames = self.frames
+        return blit_batch(surface, [(frames[f], (l, t)) for f, l, t in zip(frame.tolist(), left.tolist(), top.tolist())])
+
+    def empty(self):
+        self.count = 0
+
+    def snapshot(self):
+        return {"rows": super().snapshot(), "kinds": list(self.kind_ids), "dropped": self.dropped}
+
+    def restore(self, state):
+        kind_ids = [self.kind_id(kind) for kind in state["kinds"]]
+        rows = state["rows"]
+        super().restore({**rows, "kind": [kind_ids[k] for k in rows["kind"]]})
+        self.dropped = state["dropped"]
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,124 @@
+import pygame
+
+try:
+    from pygame._sdl2.video import Renderer, Texture, Window
+except ImportError: # Older pygame builds; frames are scaled on the CPU instead
+    Window = None
+
+DISPLAY_MODES = ("Windowed", "Fullscreen", "Borderless")
+SCALING_MODES = ("aspect", "integer", "stretch")
+
+class Presenter:
+    """
+    Owns the window and puts the finished frame on it. Everything draws into
+    `frame`, a plain surface at the game's logical size, and present()
+    uploads it to an SDL texture that the renderer scales to the window, so
+    the CPU never rescales a frame. Scaling keeps the aspect ratio
+    (letterboxed), snaps to whole multiples ("integer"), or fills the window
+    ("stretch"). Without pygame._sdl2 the same frame is scaled on the CPU.
+    """
+    def __init__(self, logical_size, title, display_mode="Windowed", scaling="aspect", software=False):
+        self.logical_size = logical_size
+        self.scaling = scaling
+        self.display_mode = None
+        if Window is None:
+            self.window = None
+            self.screen = pygame.display.set_mode(logical_size)
+            pygame.display.set_caption(title)
+        else:
+            # The display module keeps a hidden 1x1 window only so convert() has a pixel format
+            pygame.display.set_mode((1, 1), pygame.HIDDEN)
+            self.window = Window(title, size=logical_size)
+            self.renderer = Renderer(self.window, accelerated=0 if software else -1, vsync=False)
+        self.frame = pygame.Surface(logical_size).convert()
+        if self.window is not None:
+            self.texture = Texture(self.renderer, logical_size, streaming=True)
+            self.texture.update(self.frame)
+        self.window_size = None
+        self.set_display_mode(display_mode)
+
+    def set_display_mode(self, display_mode):
+        if display_mode == self.display_mode:
+            return
+        self.display_mode = display_mode
+        desktop_size = pygame.display.get_desktop_sizes()[0]
+        if self.window is None:
+            if display_mode == "Fullscreen":
+                self.screen = pygame.display.set_mode(desktop_size, pygame.FULLSCREEN)
+            elif display_mode == "Borderless":
+                self.screen = pygame.display.set_mode(desktop_size, pygame.NOFRAME)
+            else:
+                self.screen = pygame.display.set_mode(self.logical_size)
+        elif display_mode == "Fullscreen":
+            self.window.set_fullscreen(desktop=True)
+        else:
+            self.window.set_windowed()
+            if display_mode == "Borderless":
+                self.window.borderless = True
+                self.window.position = (0, 0)
+                self.window.size = desktop_size
+            else:
+                self.window.borderless = False
+                self.window.size = self.logical_size
+                self.window.position = ((desktop_size[0] - self.logical_size[0]) // 2, (desktop_size[1] - self.logical_size[1]) // 2)
+        self.window_size = None
+
+    def set_scaling(self, scaling):
+        self.scaling = scaling
+        self.window_size = None
+
+    def _update_layout(self):
+        window_size = self.window.size if self.window is not None else self.screen.get_size()
+        if window_size == self.window_size:
+            return
+        self.window_size = window_size
+        width, height = self.logical_size
+        if self.scaling == "stretch":
+            self.dest = pygame.Rect((0, 0), window_size)
+            return
+        scale = min(window_size[0] / width, window_size[1] / height)
+        if self.scaling == "integer" and scale >= 1:
+            scale = int(scale)
+        self.dest = pygame.Rect(0, 0, round(width * scale), round(height * scale))
+        self.dest.center = (window_size[0] // 2, window_size[1] // 2)
+
+    def to_logical(self, pos):
+        """Maps a window position (e.g. a mouse event's) to frame coordinates."""
+        self._update_layout()
+        dest = self.dest
+        return ((pos[0] - dest.x) * self.logical_size[0] / dest.width, (pos[1] - dest.y) * self.logical_size[1] / dest.height)
+
+    def present(self, dirty=None):
+        """Shows the frame. With `dirty`, only those frame rects are uploaded; the rest of the texture is reused."""
+        self._update_layout()
+        source = self.frame
+        if self.window is None:
+            if self.dest.size == self.logical_size and dirty is not None:
+                for rect in dirty:
+                    self.screen.blit(source, rect.move(self.dest.topleft), rect)
+                pygame.display.update([rect.move(self.dest.topleft) for rect in dirty])
+                return
+            self.screen.fill((0, 0, 0))
+            self.screen.blit(pygame.transform.scale(source, self.dest.size), self.dest)
+            pygame.display.flip()
+            return
+
+        if dirty is None:
+            self.texture.update(source)
+        else:
+            for rect in dirty:
+                rect = rect.clip(source.get_rect())
+                if rect:
+                    self.texture.update(source.subsurface(rect), rect)
+        renderer = self.renderer
+        renderer.draw_color = (0, 0, 0, 255)
+        renderer.clear()
+        renderer.blit(self.texture, self.dest)
+        renderer.present()
+
+def close_events_to_quit(events):
+    """
+    Turns the game window's close event into QUIT. SDL only sends QUIT once
+    the last window closes, and the display module's hidden window stays open.
+    """
+    return [pygame.event.Event(pygame.QUIT) if event.type == pygame.WINDOWCLOSE else event for event in events]
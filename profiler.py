@@ -0,0 +1,215 @@
+import cProfile
+import json
+import os
+import time
+from collections import deque
+from contextlib import nullcontext
+import pygame
+from text_cache import get_font, text_cache
+
+class PhaseTimer:
+    """Records the wall time of each named phase, once per frame, for later summarising."""
+    def __init__(self):
+        self.samples = {}
+
+    def phase(self, name):
+        return _PhaseSpan(self, name)
+
+    def record(self, name, start, end):
+        self.samples.setdefault(name, []).append(end - start)
+
+    def summary(self):
+        """Per-phase totals, mean, 95th percentile and worst frame, in milliseconds."""
+        result = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            result[name] = {
+                "total_ms": sum(ordered) * 1000,
+                "mean_ms": sum(ordered) / len(ordered) * 1000,
+                "p95_ms": ordered[int(len(ordered) * 0.95)] * 1000 if len(ordered) > 1 else ordered[0] * 1000,
+                "max_ms": ordered[-1] * 1000,
+                "frames": len(ordered),
+            }
+        return result
+
+class _PhaseSpan:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, self.start, time.perf_counter())
+
+class NullTimer:
+    """Timer that measures nothing; the default so the game loop pays almost nothing for profiling hooks."""
+    _span = nullcontext()
+
+    def phase(self, name):
+        return self._span
+
+NULL_TIMER = NullTimer()
+
+class FrameProfiler:
+    """
+    Rolling profile of the running game: whole-frame times for the overlay
+    graph, per-phase totals for the current and recent frames, and a ring
+    buffer of every span that can be dumped as a Chrome trace. Can also
+    wrap a cProfile capture around a stretch of frames.
+    """
+    def __init__(self, history=600, output_dir="profiles"):
+        self.frame = 0
+        self.frame_start = None
+        self.frame_times = deque(maxlen=history)
+        self.phase_history = deque(maxlen=60)
+        self.current_phases = {}
+        self.spans = deque(maxlen=history * 12)
+        self.origin = time.perf_counter()
+        self.output_dir = output_dir
+        self.cprofile = None
+
+    def begin_frame(self):
+        self.frame += 1
+        self.current_phases = {}
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        end = time.perf_counter()
+        self.frame_times.append((end - self.frame_start) * 1000)
+        self.spans.append(("frame", self.frame_start, end, self.frame))
+        self.phase_history.append(self.current_phases)
+
+    def phase(self, name):
+        return _PhaseSpan(self, name)
+
+    def record(self, name, start, end):
+        self.spans.append((name, start, end, self.frame))
+        self.current_phases[name] = self.current_phases.get(name, 0.0) + (end - start)
+
+    def phase_averages(self):
+        """Mean milliseconds per frame for each phase over the recent frames."""
+        totals = {}
+        for phases in self.phase_history:
+            for name, seconds in phases.items():
+                totals[name] = totals.get(name, 0.0) + seconds
+        frames = max(len(self.phase_history), 1)
+        return {name: seconds / frames * 1000 for name, seconds in totals.items()}
+
+    def _output_path(self, prefix, extension):
+        os.makedirs(self.output_dir, exist_ok=True)
+        return os.path.join(self.output_dir, f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}.{extension}")
+
+    def chrome_trace(self):
+        """The buffered spans in Chrome's trace event format (load in chrome://tracing or Perfetto)."""
+        events = []
+        for name, start, end, frame in self.spans:
+            events.append({"name": name, "cat": "frame" if name == "frame" else "phase", "ph": "X",
+                           "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6,
+                           "pid": 1, "tid": 1, "args": {"frame": frame}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump_chrome_trace(self, path=None):
+        path = path or self._output_path("trace", "json")
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        return path
+
+    def toggle_cprofile(self):
+        """Starts a cProfile capture, or stops the running one and returns the .prof file it was saved to."""
+        if self.cprofile is None:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+            return None
+        self.cprofile.disable()
+        path = self._output_path("profile", "prof")
+        self.cprofile.dump_stats(path)
+        self.cprofile = None
+        return path
+
+class ProfilerOverlay:
+    """
+    Sidebar panel showing the frame-time graph, per-phase timings, entity
+    counts and per-layer draw counts from a FrameProfiler. The panel grows
+    upwards to fit its lines and never shrinks, so it always covers what it
+    drew on earlier frames.
+    """
+    WIDTH = 250
+    GRAPH_HEIGHT = 60
+    BUDGET_MS = 1000 / 60
+
+    def __init__(self, profiler, font_name):
+        self.profiler = profiler
+        self.font = get_font(font_name, 14)
+        self.line_height = self.font.get_linesize() + 2
+        self.surface = pygame.Surface((self.WIDTH, self.GRAPH_HEIGHT))
+        self.visible = False
+        self.last_output = None # Where the last F4/F5 capture was written
+
+    def toggle(self):
+        self.visible = not self.visible
+
+    def dump_chrome_trace(self):
+        self.last_output = self.profiler.dump_chrome_trace()
+
+    def toggle_cprofile(self):
+        path = self.profiler.toggle_cprofile()
+        if path:
+            self.last_output = path
+
+    def draw(self, surface, bottomleft, counts, layer_counts=None):
+        """Draws the panel with its bottom-left corner at `bottomleft` and returns the rect it covers."""
+        if not self.visible:
+            return None
+        frame_times = list(self.profiler.frame_times)[-self.WIDTH:]
+        lines = self._lines(frame_times, counts, layer_counts)
+        panel_height = self.GRAPH_HEIGHT + 6 + len(lines) * self.line_height
+        if panel_height > self.surface.get_height():
+            self.surface = pygame.Surface((self.WIDTH, panel_height))
+        panel = self.surface
+        panel.fill((20, 20, 20))
+
+        # Frame-time graph, scaled so the 60 FPS budget line sits at half height
+        scale = self.GRAPH_HEIGHT / (self.BUDGET_MS * 2)
+        for x, ms in enumerate(frame_times):
+            height = min(int(ms * scale), self.GRAPH_HEIGHT)
+            color = (0, 200, 0) if ms <= self.BUDGET_MS else (220, 60, 60)
+            pygame.draw.line(panel, color, (x, self.GRAPH_HEIGHT), (x, self.GRAPH_HEIGHT - height))
+        budget_y = self.GRAPH_HEIGHT - int(self.BUDGET_MS * scale)
+        pygame.draw.line(panel, (120, 120, 120), (0, budget_y), (self.WIDTH, budget_y))
+
+        y = self.GRAPH_HEIGHT + 6
+        for line in lines:
+            panel.blit(self.font.render(line, True, (220, 220, 220)), (4, y))
+            y += self.line_height
+        rect = panel.get_rect(bottomleft=bottomleft)
+        surface.blit(panel, rect)
+        return rect
+
+    def _lines(self, frame_times, counts, layer_counts):
+        lines = []
+        if frame_times:
+            recent = frame_times[-60:]
+            average = sum(recent) / len(recent)
+            lines.append(f"frame {average:.2f} ms  max {max(recent):.2f} ms")
+        phases = list(self.profiler.phase_averages().items())
+        for i in range(0, len(phases), 2):
+            lines.append("  ".join(f"{name} {ms:.2f}" for name, ms in phases[i:i + 2]) + " ms")
+        counts = list(counts.items())
+        for i in range(0, len(counts), 3):
+            lines.append("  ".join(f"{name} {count}" for name, count in counts[i:i + 3]))
+        if layer_counts:
+            layers = list(layer_counts.items())
+            lines.append("drawn per layer")
+            for i in range(0, len(layers), 2): # Layer names are long, so two to a line
+                lines.append("  ".join(f"{name} {count}" for name, count in layers[i:i + 2]))
+        text_stats = text_cache.stats()
+        lines.append(f"text cache {text_stats['hit_rate']:.0%} hits  {text_stats['size']}/{text_stats['capacity']}")
+        if self.profiler.cprofile is not None:
+            lines.append("cProfile recording (F5 to stop)")
+        if self.last_output:
+            lines.append(f"saved {self.last_output}")
+        return lines
@@ -0,0 +1,42 @@
+import pygame
+
+# pygame-ce's fblits skips building the list of dirty rects that blits returns
+HAS_FBLITS = hasattr(pygame.Surface, "fblits")
+
+def blit_batch(surface, batch):
+    """Blits a list of (image, position) pairs in one call, without collecting dirty rects, and returns its length."""
+    if HAS_FBLITS:
+        surface.fblits(batch)
+    else:
+        surface.blits(batch, False)
+    return len(batch)
+
+def blit_sprites(surface, sprites):
+    return blit_batch(surface, [(sprite.image, sprite.rect) for sprite in sprites])
+
+class RenderPasses:
+    """
+    Draws the frame as a fixed sequence of named layers, so draw order comes
+    from the layer a sprite belongs to rather than when it was added to a
+    group. A layer's sources are sprite groups, each submitted as one batch,
+    or callables taking the surface and returning how many things they drew.
+    `counts` holds the number drawn per layer in the last frame.
+    """
+    def __init__(self):
+        self.layers = []
+        self.counts = {}
+
+    def add(self, name, *sources):
+        self.layers.append((name, sources))
+
+    def draw(self, surface):
+        counts = self.counts
+        for name, sources in self.layers:
+            count = 0
+            for source in sources:
+                if isinstance(source, pygame.sprite.AbstractGroup):
+                    count += blit_sprites(surface, source.sprites())
+                else:
+                    count += source(surface) or 0
+            counts[name] = count
+        return counts
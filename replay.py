@@ -0,0 +1,242 @@
+"""
+Deterministic input replays. A run is fully described by its RNG seed, its
+starting player state and one input byte per frame, so that is all a replay
+stores, plus the state hash after every frame and a keyframe every
+KEYFRAME_INTERVAL frames. Playing a replay back re-runs the simulation
+headless and checks each frame's hash, which pinpoints the first frame of any
+desync. A keyframe holds a summary of the state (score, lives, counts) to help
+narrow down what diverged and a full GameSession.snapshot(), so seeking
+restores the nearest keyframe and only steps the frames after it.
+
+    python replay.py replays/replay-20250101-120000.amr             # verify
+    python replay.py replays/replay-20250101-120000.amr --seek 3000 # play up to a frame
+"""
+import array
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+import pygame
+
+MAGIC = b"AMRP"
+VERSION = 2 # Version 1 replays have no keyframe snapshots and still load
+HEADER = struct.Struct("<4sHIBIHI") # magic, version, seed, new_game, frames, keyframe interval, start state length
+KEYFRAME = struct.Struct("<IIqhII") # frame, state hash, score, lives, enemies, bullets
+KEYFRAME_INTERVAL = 300
+
+# Input byte layout: bits 0-5 are held keys, bits 6-7 keys pressed this frame
+HELD_BITS = (
+    (pygame.K_UP,),
+    (pygame.K_DOWN,),
+    (pygame.K_LEFT,),
+    (pygame.K_RIGHT,),
+    (pygame.K_LSHIFT, pygame.K_RSHIFT),
+    (pygame.K_z,),
+)
+PRESSED_BITS = (pygame.K_x, pygame.K_q)
+
+def encode_input(keys, pressed):
+    """Packs the held-key state and this frame's key presses into one byte."""
+    code = 0
+    for bit, key_group in enumerate(HELD_BITS):
+        if any(keys[key] for key in key_group):
+            code |= 1 << bit
+    for bit, key in enumerate(PRESSED_BITS, len(HELD_BITS)):
+        if key in pressed:
+            code |= 1 << bit
+    return code
+
+def decode_input(code):
+    """Returns (held keys, pressed keys) for an input byte. Both shift keys decode as left shift."""
+    held = [key_group[0] for bit, key_group in enumerate(HELD_BITS) if code & (1 << bit)]
+    pressed = [key for bit, key in enumerate(PRESSED_BITS, len(HELD_BITS)) if code & (1 << bit)]
+    return held, pressed
+
+class Replay:
+    def __init__(self, seed, new_game=True, start_state=None, keyframe_interval=KEYFRAME_INTERVAL):
+        self.seed = seed
+        self.new_game = new_game
+        self.start_state = start_state
+        self.keyframe_interval = keyframe_interval
+        self.inputs = bytearray()
+        self.hashes = array.array("I")
+        self.keyframes = [] # (frame, hash, score, lives, enemies, bullets)
+        self.snapshots = {} # Keyframe frame -> zlib-compressed JSON of the session snapshot
+
+    @property
+    def frames(self):
+        return len(self.inputs)
+
+    def keyframe_before(self, frame):
+        """The last keyframe at or before `frame`, or None. Used to report the last summary before a desync."""
+        found = None
+        for keyframe in self.keyframes:
+            if keyframe[0] > frame:
+                break
+            found = keyframe
+        return found
+
+    def save(self, path):
+        start = json.dumps(self.start_state).encode() if self.start_state is not None else b""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.new_game, self.frames, self.keyframe_interval, len(start)))
+            f.write(start)
+            f.write(self.inputs)
+            f.write(self.hashes.tobytes())
+            f.write(struct.pack("<I", len(self.keyframes)))
+            for keyframe in self.keyframes:
+                f.write(KEYFRAME.pack(*keyframe))
+            for keyframe in self.keyframes:
+                snapshot = self.snapshots.get(keyframe[0], b"")
+                f.write(struct.pack("<I", len(snapshot)))
+                f.write(snapshot)
+        return path
+
+    def snapshot(self, frame):
+        """The session snapshot stored with the keyframe at `frame`, or None."""
+        snapshot = self.snapshots.get(frame)
+        return json.loads(zlib.decompress(snapshot)) if snapshot else None
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, seed, new_game, frames, interval, start_len = HEADER.unpack_from(data)
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError(f"{path} is not a version 1 or {VERSION} replay")
+        offset = HEADER.size
+        start_state = json.loads(data[offset:offset + start_len]) if start_len else None
+        if not new_game and start_state is None:
+            start_state = {}
+        offset += start_len
+        replay = cls(seed, bool(new_game), start_state, interval)
+        replay.inputs = bytearray(data[offset:offset + frames])
+        offset += frames
+        replay.hashes.frombytes(data[offset:offset + frames * replay.hashes.itemsize])
+        offset += frames * replay.hashes.itemsize
+        (count,) = struct.unpack_from("<I", data, offset)
+        offset += 4
+        replay.keyframes = [KEYFRAME.unpack_from(data, offset + i * KEYFRAME.size) for i in range(count)]
+        offset += count * KEYFRAME.size
+        if version >= 2:
+            for keyframe in replay.keyframes:
+                (length,) = struct.unpack_from("<I", data, offset)
+                offset += 4
+                if length:
+                    replay.snapshots[keyframe[0]] = data[offset:offset + length]
+                offset += length
+        return replay
+
+class ReplayRecorder:
+    """Collects a session's per-frame input bytes and state hashes while it is played."""
+    def __init__(self, session, keyframe_interval=KEYFRAME_INTERVAL):
+        self.session = session
+        self.replay = Replay(session.seed, session.new_game, session.start_state, keyframe_interval)
+
+    def record(self, code):
+        """Call right after session.step() with the input byte that frame was stepped with."""
+        session = self.session
+        state_hash = session.state_hash()
+        self.replay.inputs.append(code)
+        self.replay.hashes.append(state_hash)
+        if session.frame_count % self.replay.keyframe_interval == 0:
+            self.replay.keyframes.append((session.frame_count, state_hash) + session.state_summary())
+            self.replay.snapshots[session.frame_count] = zlib.compress(json.dumps(session.snapshot(), separators=(",", ":")).encode(), 1)
+
+    def save(self, directory="replays"):
+        return self.replay.save(os.path.join(directory, f"replay-{time.strftime('%Y%m%d-%H%M%S')}.amr"))
+
+class ReplayPlayer:
+    """
+    Re-runs a replay headless. Seeking restores the last keyframe snapshot at
+    or before the target when that is ahead of the current frame (or the
+    target is behind it), then steps the simulation at full speed. Every
+    restored and stepped frame is checked against the recorded hash.
+    """
+    def __init__(self, replay):
+        import main # Deferred so the caller can pick SDL drivers before pygame starts
+        self.main = main
+        self.replay = replay
+        self.restored_from = None # Keyframe the last seek restored, if any
+        self.restart()
+
+    def restart(self):
+        replay = self.replay
+        self.desync = None
+        self.session = self.main.GameSession(replay.new_game, headless=True, seed=replay.seed, saved_data=replay.start_state or {})
+
+    @property
+    def frame(self):
+        return self.session.frame_count
+
+    def step(self):
+        """Advances one recorded frame. Returns False at the end of the replay."""
+        session = self.session
+        if session.frame_count >= self.replay.frames:
+            return False
+        held, pressed = decode_input(self.replay.inputs[session.frame_count])
+        session.step(self.main.KeyState(held), pressed)
+        if self.desync is None and session.state_hash() != self.replay.hashes[session.frame_count - 1]:
+            self.desync = session.frame_count
+        return True
+
+    def seek(self, frame):
+        replay = self.replay
+        keyframe = replay.keyframe_before(min(frame, replay.frames))
+        snapshot = None
+        self.restored_from = None
+        if keyframe is not None and (keyframe[0] > self.frame or frame < self.frame):
+            snapshot = replay.snapshot(keyframe[0])
+        if snapshot is not None:
+            self.session.restore(snapshot)
+            self.restored_from = keyframe[0]
+            if self.desync is None and self.session.state_hash() != keyframe[1]:
+                self.desync = keyframe[0]
+        elif frame < self.frame:
+            self.restart()
+        while self.frame < frame and self.step():
+            pass
+        return self.session
+
+    def verify(self):
+        """Steps every frame from the start, restoring nothing, and returns the first desynced frame, or None if every hash matched."""
+        if self.frame:
+            self.restart()
+        while self.step():
+            pass
+        return self.desync
+
+def cli(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Verify a replay's per-frame state hashes, or seek to a frame.")
+    parser.add_argument("path")
+    parser.add_argument("--seek", type=int, help="play up to this frame from the nearest keyframe and print its state")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    replay = Replay.load(args.path)
+    player = ReplayPlayer(replay)
+    start = time.perf_counter()
+    if args.seek is not None:
+        player.seek(args.seek)
+    else:
+        player.verify()
+    elapsed = time.perf_counter() - start
+
+    result = {"frames": player.frame, "recorded_frames": replay.frames, "seed": replay.seed,
+              "seconds": round(elapsed, 3), "desync": player.desync}
+    if player.desync is not None:
+        keyframe = replay.keyframe_before(player.desync)
+        result["last_good_keyframe"] = keyframe[0] if keyframe else 0
+    if args.seek is not None:
+        result["restored_from"] = player.restored_from
+        result["state"] = dict(zip(("score", "lives", "enemies", "bullets"), player.session.state_summary()))
+    print(json.dumps(result, indent=2))
+    return 1 if player.desync is not None else 0
+
+if __name__ == "__main__":
+    sys.exit(cli())
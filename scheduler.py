@@ -0,0 +1,50 @@
+import heapq
+
+class Scheduler:
+    """
+    Runs script coroutines: generators that yield how many frames to wait
+    before they are resumed (1, or a bare yield, means next frame; anything
+    overdue also resumes next frame). Sleeping scripts sit in a heap keyed on
+    the frame they wake at, so an update only touches the scripts that are
+    due, however many are waiting. Each resume counts as one event.
+    """
+    def __init__(self, frame=0):
+        self.frame = frame
+        self.queue = [] # (wake frame, sequence, coroutine); the sequence keeps same-frame wakes in order
+        self.sequence = 0
+        self.events = 0 # Resumes during the last update
+        self.total_events = 0
+        self.peak_events = 0
+
+    def start(self, coroutine):
+        """Runs `coroutine` up to its first yield now, then schedules it. Scripts can start others to run in parallel."""
+        self._resume(coroutine)
+
+    def _resume(self, coroutine):
+        try:
+            wait = next(coroutine)
+        except StopIteration:
+            return
+        heapq.heappush(self.queue, (self.frame + max(wait or 1, 1), self.sequence, coroutine))
+        self.sequence += 1
+
+    def update(self, frame):
+        """Resumes every script due at or before `frame` and returns how many were resumed."""
+        self.frame = frame
+        queue = self.queue
+        events = 0
+        while queue and queue[0][0] <= frame:
+            _, _, coroutine = heapq.heappop(queue)
+            self._resume(coroutine)
+            events += 1
+        self.events = events
+        self.total_events += events
+        if events > self.peak_events:
+            self.peak_events = events
+        return events
+
+    def stats(self):
+        return {"pending": len(self.queue), "events": self.events, "total_events": self.total_events, "peak_events": self.peak_events}
+
+    def __len__(self):
+        return len(self.queue)
@@ -0,0 +1,50 @@
+import argparse
+import random
+import numpy as np
+
+# Replays store the seed as a uint32
+SEED_LIMIT = 2 ** 32
+
+class RngStreams:
+    """
+    Independent random streams per subsystem, all derived from one run seed,
+    so a run replays identically given the seed and its inputs. Always read
+    the streams through the shared instance (streams.stage, ...) because
+    reseeding replaces them.
+    """
+    def __init__(self, seed=None):
+        self.reseed(seed)
+
+    def reseed(self, seed=None):
+        if seed is None:
+            seed = random.SystemRandom().randrange(SEED_LIMIT)
+        elif not 0 <= seed < SEED_LIMIT:
+            raise ValueError(f"seed must be in [0, {SEED_LIMIT}), got {seed}")
+        self.seed = seed
+        stage_seq, patterns_seq, bullets_seq = np.random.SeedSequence(seed).spawn(3)
+        self.stage = random.Random(int(stage_seq.generate_state(1)[0])) # Wave composition
+        self.patterns = random.Random(int(patterns_seq.generate_state(1)[0])) # Enemy movement decisions
+        self.bullets = np.random.default_rng(bullets_seq) # Batched bullet scatter
+
+    def getstate(self):
+        """Every stream's position as JSON-safe data, for replay keyframes."""
+        return {"stage": self.stage.getstate(), "patterns": self.patterns.getstate(), "bullets": self.bullets.bit_generator.state}
+
+    def setstate(self, state):
+        # JSON turns random.Random's state tuples into lists
+        for name in ("stage", "patterns"):
+            version, internal, gauss = state[name]
+            getattr(self, name).setstate((version, tuple(internal), gauss))
+        self.bullets.bit_generator.state = state["bullets"]
+
+def parse_seed(text):
+    """argparse type for --seed options: an integer a replay header can hold."""
+    try:
+        seed = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid seed: {text!r}")
+    if not 0 <= seed < SEED_LIMIT:
+        raise argparse.ArgumentTypeError(f"seed must be in [0, {SEED_LIMIT}), got {seed}")
+    return seed
+
+streams = RngStreams()
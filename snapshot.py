@@ -0,0 +1,80 @@
+"""
+Plain-data copies of simulation objects for replay keyframes. encode_attrs()
+turns an object's attributes into JSON-safe values and decode_attrs() sets
+them back on an object the restoring session has built itself, so images,
+sounds and references to the session's groups and fields are never stored:
+they are listed in SKIP and come from the new object's constructor.
+"""
+import sys
+import types
+import numpy as np
+import pygame
+from collision import Hitbox
+from formations import BakedPath, bake_path
+
+SKIP = frozenset({
+    "_Sprite__g", "image", "image_orig", "rotation_frames", "mask", "shooting_sound", "beam_sound",
+    "font", "text_surface", "player", "all_sprites", "enemy_bullets", "targets", "pool",
+    "weapon_manager", "weapon_ui", "weapons", "keys", "enemies", "bosses", "scheduler",
+})
+
+def encode(value, sprite_ids):
+    """
+    One attribute value as JSON-safe data. Sprites are stored as their index
+    in the snapshot's sprite list (`sprite_ids` maps id() to it); a sprite
+    that is not in the list has been killed and comes back as a detached one.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pygame.math.Vector2):
+        return {"vector": [value.x, value.y]}
+    if isinstance(value, pygame.Rect):
+        return {"rect": list(value)}
+    if isinstance(value, Hitbox):
+        return {"hitbox": list(value)}
+    if isinstance(value, tuple):
+        return {"tuple": [encode(item, sprite_ids) for item in value]}
+    if isinstance(value, list):
+        return [encode(item, sprite_ids) for item in value]
+    if isinstance(value, dict):
+        return {"dict": [[encode(key, sprite_ids), encode(item, sprite_ids)] for key, item in value.items()]}
+    if isinstance(value, types.FunctionType):
+        return {"function": [value.__module__, value.__qualname__]}
+    if isinstance(value, BakedPath):
+        return {"path": encode(value.key, sprite_ids)}
+    if isinstance(value, pygame.sprite.Sprite):
+        return {"sprite": sprite_ids.get(id(value))}
+    raise TypeError(f"cannot snapshot a {type(value).__name__}")
+
+def decode(data, sprites):
+    if not isinstance(data, (list, dict)):
+        return data
+    if isinstance(data, list):
+        return [decode(item, sprites) for item in data]
+    (kind, value), = data.items()
+    if kind == "vector":
+        return pygame.math.Vector2(value)
+    if kind == "rect":
+        return pygame.Rect(value)
+    if kind == "hitbox":
+        return Hitbox(*value)
+    if kind == "tuple":
+        return tuple(decode(item, sprites) for item in value)
+    if kind == "dict":
+        return {decode(key, sprites): decode(item, sprites) for key, item in value}
+    if kind == "function":
+        return getattr(sys.modules[value[0]], value[1])
+    if kind == "path":
+        return bake_path(*decode(value, sprites))
+    if kind == "sprite":
+        return sprites[value] if value is not None else pygame.sprite.Sprite()
+    raise ValueError(f"unknown snapshot value {kind!r}")
+
+def encode_attrs(obj, sprite_ids=None):
+    return {name: encode(value, sprite_ids or {}) for name, value in vars(obj).items() if name not in SKIP}
+
+def decode_attrs(obj, attrs, sprites=()):
+    for name, data in attrs.items():
+        setattr(obj, name, decode(data, sprites))
@@ -1,10 +1,26 @@
 import pygame
-import random
 from Enemy import EnemyTypeA, EnemyTypeB, EnemyTypeC, BossTypeA, Miniboss, pattern_simple_shot, pattern_burst_shot, pattern_spiral_shot, pattern_triple_shot, pattern_aimed_shot, pattern_emerald_shot
 from config import SCREEN_WIDTH, SCREEN_HEIGHT
+from formations import bake_formation
+from scheduler import Scheduler
+from seeding import streams
+
+# Enemy types a stage script can spawn by name
+ENEMY_TYPES = {"A": EnemyTypeA, "B": EnemyTypeB, "C": EnemyTypeC}
+
+def enemy_spec(enemy_type, x, y, waypoints=None, bullet_pattern=None, speed=1, fast_entry=False):
+    return {"type": enemy_type, "x": x, "y": y, "waypoints": waypoints, "bullet_pattern": bullet_pattern, "speed": speed, "fast_entry": fast_entry}
 
 class Stage:
-    def __init__(self, player, all_sprites, enemies, enemy_bullets, bosses):
+    """
+    A stage is a script() coroutine run by a Scheduler. The script yields
+    the number of frames to wait, usually self.until(t) to wait for stage
+    time t, where stage time 0 is the first frame after the stage was
+    created. Parallel timelines are started with self.scheduler.start().
+    Scripts must only depend on stage time and streams.stage, not on the
+    state of the game, so that fast_forward() can resume them.
+    """
+    def __init__(self, player, all_sprites, enemies, enemy_bullets, bosses, frame_count=0):
         self.player = player
         self.all_sprites = all_sprites
         self.enemies = enemies
@@ -12,81 +28,61 @@ class Stage:
         self.bosses = bosses
         self.stage_complete = False
         self.boss_spawned = False
+        self.start_frame = frame_count
+        self.first_update = None # The session holds stage updates back during the welcome animation
+        self.scheduler = Scheduler(frame_count)
+        self.scheduler.start(self.script())
 
-    def update(self): pass
-    def spawn_enemies(self): pass
-    def spawn_boss(self): pass
+    def update(self, frame_count):
+        if self.first_update is None:
+            self.first_update = frame_count
+        self.scheduler.update(frame_count)
 
-class Stage1(Stage):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.miniboss_alive = False
-        self.miniboss_fight_start_time = 0
-        self.waves = [
-            {"time": 60, "enemies": [{"type": "A", "x": 100, "y": -50, "waypoints": [(100, 100)], "bullet_pattern": pattern_aimed_shot}, {"type": "A", "x": 300, "y": -50, "waypoints": [(300, 100)], "bullet_pattern": pattern_aimed_shot}, {"type": "A", "x": 500, "y": -50, "waypoints": [(500, 100)], "bullet_pattern": pattern_aimed_shot}]},
-            {"time": 300, "enemies": [{"type": "B", "x": 200, "y": -50, "waypoints": [(200, 150)], "bullet_pattern": pattern_emerald_shot}, {"type": "B", "x": 400, "y": -50, "waypoints": [(400, 150)], "bullet_pattern": pattern_aimed_shot}]},
-            {"time": 600, "enemies": [{"type": "C", "x": 300, "y": -50, "waypoints": [(300, 200)], "bullet_pattern": pattern_aimed_shot, "speed": 1, "fast_entry": True}]},
-            {"time": 720, "enemies": [{"type": "Miniboss", "x": 400, "y": -100, "waypoints": [(400, 100)]}]},
-            {"time": 900, "enemies": [{"type": "A", "x": 100, "y": -50, "waypoints": [(100, 100)], "bullet_pattern": pattern_aimed_shot}, {"type": "B", "x": 300, "y": -50, "waypoints": [(300, 150)], "bullet_pattern": pattern_emerald_shot}, {"type": "A", "x": 500, "y": -50, "waypoints": [(500, 100)], "bullet_pattern": pattern_aimed_shot}]},
-            {"time": 1200, "random": True, "count": 5},
-            {"time": 1500, "enemies": [
-                {"type": "A", "x": 100, "y": -50, "waypoints":  [(100, 300), (400, 300), (700, 300)], "speed": 5, "bullet_pattern": pattern_aimed_shot},
-                {"type": "A", "x": 100, "y": -100, "waypoints": [(100, 300), (400, 300), (700, 300)], "speed": 5, "bullet_pattern": pattern_aimed_shot},
-                {"type": "A", "x": 100, "y": -150, "waypoints": [(100, 300), (400, 300), (700, 300)], "speed": 5, "bullet_pattern": pattern_aimed_shot},
-                {"type": "A", "x": 100, "y": -200, "waypoints": [(100, 300), (400, 300), (700, 300)], "speed": 5, "bullet_pattern": pattern_aimed_shot},
-                {"type": "A", "x": 100, "y": -250, "waypoints": [(100, 300), (400, 300), (700, 300)], "speed": 5, "bullet_pattern": pattern_aimed_shot},
-                {"type": "A", "x": 100, "y": -300, "waypoints": [(100, 300), (400, 300), (700, 300)], "speed": 5, "bullet_pattern": pattern_aimed_shot},
-            ]},
-            {"time": 1560, "enemies": [
-                {"type": "A", "x": 700, "y": -50, "waypoints":  [(700, 300), (400, 300), (100, 300)], "speed": 5, "bullet_pattern": pattern_aimed_shot},
-                {"type": "A", "x": 700, "y": -100, "waypoints": [(700, 300), (400, 300), (100, 300)], "speed": 5, "bullet_pattern": pattern_aimed_shot},
-                {"type": "A", "x": 700, "y": -150, "waypoints": [(700, 300), (400, 300), (100, 300)], "speed": 5, "bullet_pattern": pattern_aimed_shot},
-                {"type": "A", "x": 700, "y": -200, "waypoints": [(700, 300), (400, 300), (100, 300)], "speed": 5, "bullet_pattern": pattern_aimed_shot},
-                {"type": "A", "x": 700, "y": -250, "waypoints": [(700, 300), (400, 300), (100, 300)], "speed": 5, "bullet_pattern": pattern_aimed_shot},
-                {"type": "A", "x": 700, "y": -300, "waypoints": [(700, 300), (400, 300), (100, 300)], "speed": 5, "bullet_pattern": pattern_aimed_shot},
-            ]}
-        ]
-        self.wave_index = 0
-        self.stage_timer = 0
+    def fast_forward(self, first_update, frame):
+        """
+        Brings a newly created stage's scripts to where they were after the
+        update at `frame`, for restoring a replay keyframe. The scripts are
+        resumed at the frames they originally woke at, so the queue comes out
+        the same, but whatever they spawn goes into throwaway groups: the
+        keyframe already holds the sprites. The caller restores the stage's
+        own attributes and the random streams afterwards.
+        """
+        if first_update is None:
+            return
+        groups = self.all_sprites, self.enemies, self.bosses
+        self.all_sprites, self.enemies, self.bosses = (pygame.sprite.Group() for _ in range(3))
+        scheduler = self.scheduler
+        scheduler.update(first_update)
+        while scheduler.queue and scheduler.queue[0][0] <= frame:
+            scheduler.update(scheduler.queue[0][0])
+        scheduler.frame = frame
+        self.all_sprites, self.enemies, self.bosses = groups
+        self.first_update = first_update
 
-    def update(self, frame_count):
-        self.spawn_enemies(frame_count)
-        if not self.boss_spawned and frame_count - self.stage_timer > 1800:
-            self.spawn_boss()
-            self.boss_spawned = True
+    def script(self):
+        return
+        yield
 
-        if self.boss_spawned and not self.bosses:
-            self.stage_complete = True
+    def until(self, time):
+        """Frames to wait for stage time `time`; already-passed times resume on the next frame."""
+        return self.start_frame + 1 + time - self.scheduler.frame
+
+    def formation(self, *specs):
+        """Bakes the waypoint paths of a group of enemy specs (see formations.py) and returns them for spawn_formation."""
+        bake_formation(specs, SCREEN_HEIGHT)
+        return specs
 
-    def spawn_enemies(self, frame_count):
-        if self.wave_index < len(self.waves):
-            wave = self.waves[self.wave_index]
-            if frame_count - self.stage_timer > wave["time"]:
-                if wave.get("random"):
-                    for _ in range(wave["count"]):
-                        enemy_type = random.choice(["A", "B", "C"])
-                        x = random.randrange(SCREEN_WIDTH - 30)
-                        y = -50
-                        bullet_pattern = random.choice([pattern_simple_shot, pattern_burst_shot, pattern_spiral_shot, pattern_emerald_shot])
-                        self.spawn_enemy(enemy_type, x, y, None, 1, bullet_pattern, frame_count)
-                else:
-                    for enemy_info in wave["enemies"]:
-                        self.spawn_enemy(enemy_info["type"], enemy_info["x"], enemy_info["y"], enemy_info.get("waypoints"), enemy_info.get("speed", 1), enemy_info.get("bullet_pattern"), frame_count, enemy_info.get("fast_entry", False))
-                self.wave_index += 1
-
-    def spawn_enemy(self, enemy_type, x, y, waypoints, speed, bullet_pattern, frame_count, fast_entry=False):
-        if enemy_type == "A":
-            enemy = EnemyTypeA(x, y, self.player, self.all_sprites, self.enemy_bullets, SCREEN_HEIGHT, waypoints=waypoints, speed=speed, bullet_pattern=bullet_pattern, fast_entry=fast_entry)
-        elif enemy_type == "B":
-            enemy = EnemyTypeB(x, y, self.player, self.all_sprites, self.enemy_bullets, SCREEN_HEIGHT, waypoints=waypoints, speed=speed, bullet_pattern=bullet_pattern, fast_entry=fast_entry)
-        elif enemy_type == "C":
-            enemy = EnemyTypeC(x, y, self.player, self.all_sprites, self.enemy_bullets, SCREEN_HEIGHT, waypoints=waypoints, speed=speed, bullet_pattern=bullet_pattern, fast_entry=fast_entry)
-        elif enemy_type == "Miniboss":
-            enemy = Miniboss(x, y, self.player, self.all_sprites, self.enemy_bullets, SCREEN_HEIGHT, waypoints=waypoints)
-            self.miniboss_alive = True
-            self.miniboss_fight_start_time = frame_count
+    def spawn_formation(self, specs):
+        for spec in specs:
+            self.spawn_enemy(spec["type"], spec["x"], spec["y"], spec["waypoints"], spec["speed"], spec["bullet_pattern"], spec["fast_entry"], spec.get("path"))
+
+    def spawn_enemy(self, enemy_type, x, y, waypoints=None, speed=1, bullet_pattern=None, fast_entry=False, path=None):
+        enemy = ENEMY_TYPES[enemy_type](x, y, self.player, self.all_sprites, self.enemy_bullets, SCREEN_HEIGHT, waypoints=waypoints, speed=speed, bullet_pattern=bullet_pattern, fast_entry=fast_entry)
+        if path is not None:
+            enemy.follow_path(*path)
         self.all_sprites.add(enemy)
         self.enemies.add(enemy)
+        return enemy
 
     def spawn_boss(self):
         for enemy in self.enemies:
@@ -94,6 +90,64 @@ class Stage1(Stage):
         boss = BossTypeA(self.player, self.all_sprites, self.enemy_bullets)
         self.all_sprites.add(boss)
         self.bosses.add(boss)
+        self.boss_spawned = True
+
+class Stage1(Stage):
+    def __init__(self, *args, **kwargs):
+        self.miniboss_alive = False
+        self.miniboss_fight_start_time = 0
+        super().__init__(*args, **kwargs)
+
+    def update(self, frame_count):
+        super().update(frame_count)
+        if self.boss_spawned and not self.bosses:
+            self.stage_complete = True
+
+    def script(self):
+        # Everything before the first yield runs when the stage is created, so formations are baked up front
+        opening = self.formation(*(enemy_spec("A", x, -50, [(x, 100)], pattern_aimed_shot) for x in (100, 300, 500)))
+        pair = self.formation(enemy_spec("B", 200, -50, [(200, 150)], pattern_emerald_shot),
+                              enemy_spec("B", 400, -50, [(400, 150)], pattern_aimed_shot))
+        dive = self.formation(enemy_spec("C", 300, -50, [(300, 200)], pattern_aimed_shot, fast_entry=True))
+        mixed = self.formation(enemy_spec("A", 100, -50, [(100, 100)], pattern_aimed_shot),
+                               enemy_spec("B", 300, -50, [(300, 150)], pattern_emerald_shot),
+                               enemy_spec("A", 500, -50, [(500, 100)], pattern_aimed_shot))
+        # Columns of six queued one behind another, sweeping across the middle of the screen
+        sweep_right = self.formation(*(enemy_spec("A", 100, -50 * i, [(100, 300), (400, 300), (700, 300)], pattern_aimed_shot, speed=5) for i in range(1, 7)))
+        sweep_left = self.formation(*(enemy_spec("A", 700, -50 * i, [(700, 300), (400, 300), (100, 300)], pattern_aimed_shot, speed=5) for i in range(1, 7)))
+        self.scheduler.start(self.boss_timeline())
+
+        yield self.until(60)
+        self.spawn_formation(opening)
+        yield self.until(300)
+        self.spawn_formation(pair)
+        yield self.until(600)
+        self.spawn_formation(dive)
+        yield self.until(720)
+        self.spawn_miniboss(400, -100, [(400, 100)])
+        yield self.until(900)
+        self.spawn_formation(mixed)
+        yield self.until(1200)
+        for _ in range(5):
+            enemy_type = streams.stage.choice(["A", "B", "C"])
+            x = streams.stage.randrange(SCREEN_WIDTH - 30)
+            bullet_pattern = streams.stage.choice([pattern_simple_shot, pattern_burst_shot, pattern_spiral_shot, pattern_emerald_shot])
+            self.spawn_enemy(enemy_type, x, -50, bullet_pattern=bullet_pattern)
+        yield self.until(1500)
+        self.spawn_formation(sweep_right)
+        yield self.until(1560)
+        self.spawn_formation(sweep_left)
+
+    def boss_timeline(self):
+        yield self.until(1800)
+        self.spawn_boss()
+
+    def spawn_miniboss(self, x, y, waypoints):
+        enemy = Miniboss(x, y, self.player, self.all_sprites, self.enemy_bullets, SCREEN_HEIGHT, waypoints=waypoints)
+        self.miniboss_alive = True
+        self.miniboss_fight_start_time = self.scheduler.frame
+        self.all_sprites.add(enemy)
+        self.enemies.add(enemy)
 
 class Stage2(Stage): pass
 class Stage3(Stage): pass
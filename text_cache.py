@@ -0,0 +1,58 @@
+from collections import OrderedDict
+import pygame
+
+# Font files and Font objects are looked up once and shared by every caller
+_font_paths = {}
+_fonts = {}
+
+def match_font(family):
+    """pygame.font.match_font, remembered per family (the lookup scans the system font list)."""
+    if family not in _font_paths:
+        _font_paths[family] = pygame.font.match_font(family)
+    return _font_paths[family]
+
+def get_font(name, size):
+    """Shared Font for a font file (or None for pygame's default) at `size`."""
+    key = (name, size)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = pygame.font.Font(name, size)
+    return font
+
+class TextCache:
+    """
+    Bounded LRU cache of rendered text surfaces keyed by (text, font, size,
+    colour), so labels that do not change from frame to frame cost a blit
+    instead of a render. Cached surfaces are shared: blit them, never draw
+    on them or change their alpha.
+    """
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, text, font_name, size, color):
+        key = (text, font_name, size, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = self.surfaces[key] = get_font(font_name, size).render(text, True, color)
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"size": len(self.surfaces), "capacity": self.capacity, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": self.hits / lookups if lookups else 0.0}
+
+text_cache = TextCache()